@@ -0,0 +1,204 @@
+"""
+Time-bucketed series of items, logs or points.
+
+Buckets are computed in SQL: from the daily rollups when the query allows it
+(day/week/month, no user or team filter), otherwise from the log tables.
+Series read from the log tables reach past the archive horizon (archive.py)
+at month granularity only, from the monthly archive aggregates; finer
+buckets over archived time are refused.
+Closed buckets (ending before the current hour) never change unless history
+is rewritten, so their values are cached per query and only the open bucket
+and any closed buckets not seen before are queried. Backdated writes send
+history_changed, which drops every cached series.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+import models
+from app_setup import db, shared_cache
+from cache import generation, invalidate
+from signals import history_changed
+from replica import reads_fresh_until
+from archive import archived_through
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+METRICS = ('items', 'logs', 'points')
+DEFAULT_SPAN = {'hour': 48, 'day': 30, 'week': 26, 'month': 12}  # buckets when no start is given
+CACHE_TIMEOUT = 7 * 24 * 3600
+
+
+class AnalyticsError(ValueError):
+    pass
+
+
+# -----------------------------
+# Bucket arithmetic (Python side mirrors _bucket_sql)
+# -----------------------------
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = datetime(moment.year, moment.month, moment.day)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # Monday
+    return day.replace(day=1)
+
+
+def next_bucket(start: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return start + timedelta(hours=1)
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_label(start: datetime, granularity: str) -> str:
+    return start.strftime('%Y-%m-%d %H:00') if granularity == 'hour' else start.strftime('%Y-%m-%d')
+
+
+def buckets(start: datetime, end: datetime, granularity: str) -> list[datetime]:
+    """Bucket starts covering [start, end)."""
+    out, current = [], bucket_start(start, granularity)
+    while current < end:
+        out.append(current)
+        current = next_bucket(current, granularity)
+    return out
+
+
+def _bucket_sql(column, granularity):
+    """SQL expression giving the bucket label of `column` (same text as bucket_label)."""
+    if db.engine.dialect.name == 'sqlite':
+        if granularity == 'hour':
+            return func.strftime('%Y-%m-%d %H:00', column)
+        if granularity == 'day':
+            return func.date(column)
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', column)
+    fmt = 'YYYY-MM-DD HH24:00' if granularity == 'hour' else 'YYYY-MM-DD'
+    return func.to_char(func.date_trunc(granularity, column), fmt)
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def _uses_rollups(granularity, user_id, team_id):
+    return granularity != 'hour' and user_id is None and team_id is None
+
+
+def _series_query(metric, granularity, start, end, item=None, user_id=None, team_id=None):
+    """(query of (bucket label, value) rows, table it reads) for [start, end)."""
+    if _uses_rollups(granularity, user_id, team_id):
+        if metric == 'points':
+            table, value, column = models.DailyPointsRollup, models.DailyPointsRollup.points, models.DailyPointsRollup.day
+        else:
+            table, column = models.DailyItemRollup, models.DailyItemRollup.day
+            value = models.DailyItemRollup.quantity if metric == 'items' else models.DailyItemRollup.logs
+        filters = [column >= start.date(), column < end.date()]
+        if item is not None:
+            filters.append(table.item == item)
+    else:
+        if metric == 'points':
+            table, value = models.PointsLog, models.PointsLog.delta
+        else:
+            table = models.PlasticLog
+            value = models.PlasticLog.quantity if metric == 'items' else models.PlasticLog.id
+        column = table.created_at
+        filters = [column >= start, column < end]
+        if item is not None:
+            filters.append(table.item == item)
+        if user_id is not None:
+            filters.append(table.user_id == user_id)
+        if team_id is not None:
+            members = db.select(models.TeamMembership.user_id).where(models.TeamMembership.team_id == team_id)
+            filters.append(table.user_id.in_(members))
+    bucket = _bucket_sql(column, granularity)
+    aggregate = func.count(value) if value is models.PlasticLog.id else func.sum(value)
+    return db.session.query(bucket, aggregate).filter(*filters).group_by(bucket), table
+
+
+def _query(metric, granularity, start, end, item=None, user_id=None, team_id=None) -> dict:
+    """{bucket label: value} for buckets with data in [start, end)."""
+    query, table = _series_query(metric, granularity, start, end, item, user_id, team_id)
+    series = {str(label): int(total or 0) for label, total in query}
+    if table in (models.PlasticLog, models.PointsLog) and granularity == 'month':
+        # Archived logs only survive as monthly per-user totals
+        for month, total in _archived_months(metric, start, end, item, user_id, team_id):
+            label = month.strftime('%Y-%m-%d')
+            series[label] = series.get(label, 0) + int(total or 0)
+    return series
+
+
+def _archived_months(metric, start, end, item, user_id, team_id):
+    monthly = models.MonthlyUserPoints if metric == 'points' else models.MonthlyUserItem
+    filters = [monthly.month >= start.date(), monthly.month < end.date()]
+    if item is not None:
+        filters.append(monthly.item == item)
+    if user_id is not None:
+        filters.append(monthly.user_id == user_id)
+    if team_id is not None:
+        members = db.select(models.TeamMembership.user_id).where(models.TeamMembership.team_id == team_id)
+        filters.append(monthly.user_id.in_(members))
+    value = getattr(monthly, {'items': 'quantity', 'logs': 'logs', 'points': 'points'}[metric])
+    return db.session.query(monthly.month, func.sum(value)).filter(*filters).group_by(monthly.month)
+
+
+def timeseries(metric='items', granularity='day', start=None, end=None, item=None, user_id=None,
+               team_id=None, now=None) -> dict:
+    """
+    Values per bucket between `start` and `end` (datetimes, end exclusive;
+    default: the last DEFAULT_SPAN buckets up to now). Buckets with no data
+    are 0. Returns {"buckets": [{"start", "value"}], "source", "cached"}.
+    """
+    if granularity not in GRANULARITIES:
+        raise AnalyticsError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if metric not in METRICS:
+        raise AnalyticsError(f"metric must be one of {', '.join(METRICS)}")
+    if metric == 'points' and item is not None:
+        raise AnalyticsError("points cannot be filtered by item")
+    now = now or datetime.utcnow()
+    end = next_bucket(bucket_start(now, granularity), granularity) if end is None or end > now else end
+    if start is None:
+        start = end
+        for _ in range(DEFAULT_SPAN[granularity]):
+            start = bucket_start(start - timedelta(microseconds=1), granularity)
+    starts = buckets(start, end, granularity)
+    if not starts:
+        return {"buckets": [], "source": None, "cached": 0}
+    if len(starts) > current_app.config['ANALYTICS_MAX_BUCKETS']:
+        raise AnalyticsError("too many buckets; narrow the range or use a coarser granularity")
+    if granularity != 'month' and not _uses_rollups(granularity, user_id, team_id):
+        archived = archived_through()
+        if archived is not None and starts[0] < archived:
+            raise AnalyticsError(f"logs before {archived:%Y-%m-%d} are archived; use granularity=month")
+    span_end = next_bucket(starts[-1], granularity)
+
+    # Closed buckets come from the cache; only new closed buckets and the open one hit the database.
+    # On a lagging replica a bucket only counts as closed once the replica has caught up past it.
+    open_from = bucket_start(min(now, reads_fresh_until()), 'hour')
+    key = f"ts:{metric}:{granularity}:{item}:{user_id}:{team_id}:{generation('analytics')}"
+    closed = shared_cache.get(key) or {}
+    labels = [bucket_label(s, granularity) for s in starts]
+    missing = [s for s, label in zip(starts, labels)
+               if label not in closed and next_bucket(s, granularity) <= open_from]
+    values = {}
+    if missing:
+        fetched = _query(metric, granularity, missing[0], next_bucket(missing[-1], granularity),
+                         item, user_id, team_id)
+        closed.update({bucket_label(s, granularity): fetched.get(bucket_label(s, granularity), 0) for s in missing})
+        shared_cache.set(key, closed, timeout=CACHE_TIMEOUT)
+    open_starts = [s for s in starts if next_bucket(s, granularity) > open_from]
+    if open_starts:
+        values = _query(metric, granularity, open_starts[0], span_end, item, user_id, team_id)
+    series = [{"start": label, "value": closed[label] if label in closed else values.get(label, 0)}
+              for label in labels]
+    return {"buckets": series, "source": 'rollups' if _uses_rollups(granularity, user_id, team_id) else 'logs',
+            "cached": len(starts) - len(missing) - len(open_starts)}
+
+
+@history_changed.connect
+def _on_history_changed(sender, **kwargs):
+    invalidate('analytics')
@@ -1,15 +1,76 @@
+import os
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from config import DevConfig
+from sql_metrics import init_sql_metrics
+from replica import RoutingSession, configure_replica
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})  # reads may go to a replica, see replica.py
 login_manager = LoginManager()
+shared_cache = Cache()  # backend for cache.cached_aggregate (SimpleCache, Redis, ...)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 def create_app(config_obj=DevConfig):
     app = Flask(__name__)
     app.config.from_object(config_obj)
+    _sqlite_engine_options(app)
+    configure_replica(app)
     db.init_app(app)
+    if app.config['SQLITE_TUNING']:
+        with app.app_context():
+            event.listen(db.engine, 'connect', _sqlite_pragmas(app.config))
+    shared_cache.init_app(app)
     login_manager.init_app(app)
+    init_sql_metrics(app)
     login_manager.login_view = "auth.login"
+    if click.get_current_context(silent=True) is not None:
+        # Only the `flask` CLI needs `flask db ...`; alembic adds ~200 ms to cold starts
+        init_migrations(app)
     return app
+
+def init_migrations(app):
+    """Wire Flask-Migrate (alembic) into the app."""
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+def _is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def _sqlite_engine_options(app):
+    """Connection pool sizing for file-backed SQLite (in-memory databases use a single static connection)."""
+    if app.config['SQLITE_TUNING'] and _is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI']):
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        options.setdefault('pool_size', app.config['SQLITE_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['SQLITE_POOL_SIZE'] * 2)
+        options.setdefault('connect_args', {}).setdefault('timeout', app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+
+def _sqlite_pragmas(config):
+    """
+    Per-connection SQLite settings for concurrent use: WAL lets readers run
+    alongside the single writer, synchronous=NORMAL is durable in WAL mode
+    except across power loss, and busy_timeout makes writers queue for the
+    lock instead of failing with "database is locked".
+    """
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    def on_connect(dbapi_conn, connection_record):
+        if type(dbapi_conn).__module__.startswith('sqlite3'):
+            cursor = dbapi_conn.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+    return on_connect
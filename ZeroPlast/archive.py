@@ -0,0 +1,248 @@
+"""
+Archival of old PlasticLog / PointsLog rows.
+
+`flask --app main archive-logs` moves rows from whole months older than
+ARCHIVE_AFTER_DAYS out of the hot tables, ARCHIVE_BATCH_ROWS at a time. Each
+batch is written to ARCHIVE_DIR/<kind>/<YYYY-MM>/<first_id>-<last_id>.ndjson.gz
+(same columns as the admin NDJSON export), folded into the tables the app
+still reads, deleted and recorded in LogArchive, all in one transaction:
+
+    plastic  MonthlyUserItem (per user, item and month); the daily and
+             per-user rollups are left as they are
+    points   MonthlyUserPoints (per user and month) for per-user series, and
+             PointsCheckpoint (per-user sum), so ledger totals stay exact
+
+Every batch commits on its own, so a run can be stopped and resumed at any
+point; a batch that fails leaves its rows in place and is simply redone.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import delete, func, select, union_all
+import models
+from app_setup import db
+from exports import EXPORTS, _value
+from signals import history_changed, send_after_commit
+
+KINDS = ('plastic', 'points')
+
+
+def horizon(now=None) -> datetime:
+    """Rows created before this (always the first of a month) are due for archiving."""
+    return _month_start((now or datetime.utcnow()) - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS']))
+
+
+def _month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def archived_through():
+    """End of the newest archived month, or None when nothing has been archived."""
+    month = db.session.query(func.max(models.LogArchive.month)).scalar()
+    return datetime.combine(_next_month(month), time()) if month else None
+
+
+def archive_dir():
+    return current_app.config['ARCHIVE_DIR'] or os.path.join(current_app.instance_path, 'archive')
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+# -----------------------------
+# Ledger totals across hot and archived rows
+# -----------------------------
+def points_ledger(user_ids=None):
+    """
+    Subquery (user_id, points): PointsCheckpoint plus the hot PointsLog sum,
+    per user (only `user_ids`, filtered inside both halves so indexes apply).
+    """
+    hot = select(models.PointsLog.user_id, func.sum(models.PointsLog.delta).label('points')) \
+        .group_by(models.PointsLog.user_id)
+    archived = select(models.PointsCheckpoint.user_id, models.PointsCheckpoint.points)
+    if user_ids is not None:
+        hot = hot.where(models.PointsLog.user_id.in_(user_ids))
+        archived = archived.where(models.PointsCheckpoint.user_id.in_(user_ids))
+    both = union_all(hot, archived).subquery()
+    return select(both.c.user_id, func.sum(both.c.points).label('points')) \
+        .group_by(both.c.user_id).subquery()
+
+
+# -----------------------------
+# Archiving
+# -----------------------------
+def archive_batch(kind, before, batch_rows):
+    """
+    Archive up to `batch_rows` of the oldest `kind` rows created before
+    `before`, all from one month, and commit. Returns the LogArchive entry,
+    or None when nothing is left to archive.
+    """
+    model, columns = EXPORTS[kind]
+    oldest = db.session.query(func.min(model.created_at)).filter(model.created_at < before).scalar()
+    if oldest is None:
+        return None
+    month = date(oldest.year, oldest.month, 1)
+    month_end = min(datetime.combine(_next_month(month), time()), before)
+    in_month = (model.created_at >= datetime.combine(month, time()), model.created_at < month_end)
+    rows = db.session.execute(select(*(getattr(model, c) for c in columns))
+                              .where(*in_month).order_by(model.id).limit(batch_rows)).all()
+    first_id, last_id = rows[0].id, rows[-1].id
+    path = os.path.join(kind, f"{month:%Y-%m}", f"{first_id}-{last_id}.ndjson.gz")
+    _write(os.path.join(archive_dir(), path), columns, rows)
+
+    if kind == 'plastic':
+        _fold_plastic(month, rows)
+    else:
+        _fold_points(month, rows, month_end)
+    # Ids only grow, so these are exactly the rows fetched above
+    deleted = db.session.execute(delete(model).where(*in_month, model.id <= last_id)
+                                 .execution_options(synchronize_session=False)).rowcount
+    if deleted != len(rows):
+        db.session.rollback()
+        raise RuntimeError(f"{kind} {month:%Y-%m}: fetched {len(rows)} rows but would delete {deleted}")
+    entry = models.LogArchive(kind=kind, month=month, first_id=first_id, last_id=last_id, rows=len(rows), path=path)
+    db.session.add(entry)
+    send_after_commit(history_changed)
+    db.session.commit()
+    return entry
+
+
+def _write(path, columns, rows):
+    # Write next to the target and rename, so a crash never leaves a truncated archive
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, map(_value, row)))) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def _fold_plastic(month, rows):
+    totals = {}
+    for row in rows:
+        total = totals.setdefault((row.user_id, row.item), [0, 0])
+        total[0] += row.quantity or 0
+        total[1] += 1
+    existing = {(r.user_id, r.item): r for r in models.MonthlyUserItem.query.filter_by(month=month)}
+    for (user_id, item), (quantity, logs) in totals.items():
+        row = existing.get((user_id, item))
+        if row is None:
+            db.session.add(models.MonthlyUserItem(month=month, user_id=user_id, item=item,
+                                                  quantity=quantity, logs=logs))
+        else:
+            row.quantity += quantity
+            row.logs += logs
+
+
+def _points_totals(rows):
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row.user_id, [0, 0])
+        total[0] += row.delta
+        total[1] += 1
+    return totals
+
+
+def _fold_monthly_points(month, totals):
+    existing = {r.user_id: r for r in models.MonthlyUserPoints.query.filter_by(month=month)}
+    for user_id, (points, entries) in totals.items():
+        row = existing.get(user_id)
+        if row is None:
+            db.session.add(models.MonthlyUserPoints(month=month, user_id=user_id, points=points, entries=entries))
+        else:
+            row.points += points
+            row.entries += entries
+
+
+def _fold_points(month, rows, through):
+    totals = _points_totals(rows)
+    _fold_monthly_points(month, totals)
+    user_ids = list(totals)
+    existing = {}
+    for start in range(0, len(user_ids), 500):
+        existing.update((c.user_id, c) for c in models.PointsCheckpoint.query.filter(
+            models.PointsCheckpoint.user_id.in_(user_ids[start:start + 500])))
+    for user_id, (points, entries) in totals.items():
+        checkpoint = existing.get(user_id)
+        if checkpoint is None:
+            db.session.add(models.PointsCheckpoint(user_id=user_id, points=points, entries=entries, through=through))
+        else:
+            checkpoint.points += points
+            checkpoint.entries += entries
+            checkpoint.through = max(checkpoint.through, through)
+
+
+def archive_logs(before=None, batch_rows=None, max_batches=None):
+    """
+    Archive every kind until nothing older than `before` (rounded down to the
+    first of its month; default: horizon()) is left, or `max_batches` batches
+    have run. Yields each LogArchive entry.
+    """
+    before = _month_start(before) if before else horizon()
+    batch_rows = batch_rows or current_app.config['ARCHIVE_BATCH_ROWS']
+    done = 0
+    for kind in KINDS:
+        while max_batches is None or done < max_batches:
+            entry = archive_batch(kind, before, batch_rows)
+            if entry is None:
+                break
+            done += 1
+            yield entry
+
+
+def pending(before=None) -> dict:
+    """kind -> number of hot rows older than `before` (as in archive_logs)."""
+    before = _month_start(before) if before else horizon()
+    return {kind: db.session.query(func.count(EXPORTS[kind][0].id))
+            .filter(EXPORTS[kind][0].created_at < before).scalar() for kind in KINDS}
+
+
+def archived_rows(kind, start=None, end=None, user_id=None, item=None, chunk_rows=1000):
+    """
+    Archived `kind` rows matching an export's filters (as in
+    exports.export_query), read back from the archive files oldest month
+    first, in lists of up to `chunk_rows` tuples in export column order.
+    """
+    columns = EXPORTS[kind][1]
+    entries = models.LogArchive.query.filter_by(kind=kind)
+    if start:
+        entries = entries.filter(models.LogArchive.month >= _month_start(start).date())
+    if end:
+        entries = entries.filter(models.LogArchive.month <= end.date())
+    end = end + timedelta(days=1) if end else None  # inclusive day
+    for entry in entries.order_by(models.LogArchive.month, models.LogArchive.first_id).all():
+        chunk = []
+        with gzip.open(os.path.join(archive_dir(), entry.path), 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                created_at = datetime.fromisoformat(row['created_at'])
+                if (start and created_at < start) or (end and created_at >= end) \
+                        or (user_id and row['user_id'] != user_id) or (item and row.get('item', item) != item):
+                    continue
+                chunk.append(tuple(row[c] for c in columns))
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+def rebuild_monthly_points() -> int:
+    """
+    Rebuild MonthlyUserPoints from the points archive files (for batches
+    archived before the table existed). Returns the number of rows read.
+    """
+    models.MonthlyUserPoints.query.delete()
+    read = 0
+    for entry in models.LogArchive.query.filter_by(kind='points').order_by(models.LogArchive.id):
+        with gzip.open(os.path.join(archive_dir(), entry.path), 'rt', encoding='utf-8') as f:
+            rows = [SimpleNamespace(**json.loads(line)) for line in f if line.strip()]
+        _fold_monthly_points(entry.month, _points_totals(rows))
+        db.session.flush()
+        read += len(rows)
+    send_after_commit(history_changed)
+    db.session.commit()
+    return read
@@ -0,0 +1,67 @@
+"""
+Compare the built-in SVG chart renderer with the matplotlib PNG export.
+
+    python benchmarks/bench_charts.py [--runs 50]
+
+Reports mean render time and payload size for the dashboard bar chart and
+the admin trend line (the latter both as raw PNG and as the base64 string
+the old generate_trend_graph inlined into the page).
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import charts  # noqa: E402
+
+
+def _time(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--days', type=int, default=90, help='points on the trend line')
+    args = parser.parse_args()
+
+    bar = (['bottle', 'bag', 'cup'], [42, 17, 9], 'Top 3 Items by Total Logged')
+    start = date(2025, 1, 1)
+    line = ([(start + timedelta(days=i)).isoformat() for i in range(args.days)],
+            [(i * 37) % 50 + 5 for i in range(args.days)], 'Daily Plastic Log Trend')
+
+    rows = []
+    ms, svg = _time(lambda: charts.svg_bar_chart(bar[0], bar[1], title=bar[2], ylabel='Total Logged'), args.runs)
+    rows.append(('bar', 'svg', ms, len(svg.encode('utf-8'))))
+    ms, svg = _time(lambda: charts.svg_line_chart(line[0], line[1], title=line[2]), args.runs)
+    rows.append(('trend', 'svg', ms, len(svg.encode('utf-8'))))
+
+    try:
+        charts._pyplot()
+    except ImportError:
+        print("matplotlib not installed; only the SVG renderer was measured.\n")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'chart.png')
+            ms, _ = _time(lambda: charts.export_bar_png(bar[0], bar[1], bar[2], path), args.runs)
+            rows.append(('bar', 'matplotlib png', ms, os.path.getsize(path)))
+            ms, _ = _time(lambda: charts.export_line_png(line[0], line[1], line[2], path), args.runs)
+            size = os.path.getsize(path)
+            rows.append(('trend', 'matplotlib png', ms, size))
+            with open(path, 'rb') as f:
+                rows.append(('trend', 'png as base64', ms, len(base64.b64encode(f.read()))))
+
+    print(f"{'chart':<8}{'renderer':<18}{'ms/render':>12}{'bytes':>10}")
+    for chart, renderer, ms, size in rows:
+        print(f"{chart:<8}{renderer:<18}{ms:>12.2f}{size:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Concurrent reward redemption on a file-backed SQLite database.
+
+    python benchmarks/bench_redeem.py [--threads 16] [--attempts 40] [--users 4] [--stock 100]
+
+Every thread keeps redeeming the same reward for one of a few shared users,
+so most attempts race another thread on the same balance (and on the same
+stock). Each user starts with points for a quarter of one thread's
+`--attempts`, far fewer redemptions than are attempted. Two implementations run against a
+fresh database, each in its own interpreter:
+
+    check-then-insert  the old path: calculate_points, compare, insert a debit
+    atomic             utils.redeem_reward (conditional UPDATEs)
+
+and the report shows attempts/s and redemptions/s plus the invariants: overdrawn users,
+balances that disagree with the ledger, and redemptions beyond the stock.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WORKER = r'''
+import json, sys, threading, time
+mode, threads, attempts, users, stock = sys.argv[1], *map(int, sys.argv[2:6])
+import main, models, utils
+from app_setup import db
+from sqlalchemy import func
+app = main.app
+COST = 10
+with app.app_context():
+    db.create_all()
+    db.session.add_all(models.User(id=n, username=f"r{n}", email=f"r{n}@bench", password='x')
+                       for n in range(1, users + 1))
+    db.session.add(models.Reward(id=1, name='bench', cost_points=COST, stock=stock))
+    db.session.commit()
+    for n in range(1, users + 1):
+        utils.add_points(n, COST * attempts // 4, 'seed')  # a quarter of the attempts can succeed
+    db.session.commit()
+
+def legacy_redeem(user_id, reward_id):
+    reward = db.session.get(models.Reward, reward_id)
+    if utils.calculate_points(user_id) < reward.cost_points:
+        return False, "Not enough points"
+    db.session.add(models.Redemption(user_id=user_id, reward_id=reward.id))
+    utils.add_points(user_id, -reward.cost_points, f"redeem:{reward.name}")
+    db.session.commit()
+    return True, "ok"
+
+redeem = utils.redeem_reward if mode == 'atomic' else legacy_redeem
+ok, refused, errors = [0], [0], [0]
+lock = threading.Lock()
+barrier = threading.Barrier(threads)
+
+def worker(n):
+    uid = n % users + 1
+    barrier.wait()
+    for _ in range(attempts):
+        with app.app_context():
+            try:
+                success, _ = redeem(uid, 1)
+            except Exception:
+                db.session.rollback()
+                success = None
+        with lock:
+            (ok if success else errors if success is None else refused)[0] += 1
+
+started = time.perf_counter()
+pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+for t in pool: t.start()
+for t in pool: t.join()
+elapsed = time.perf_counter() - started
+with app.app_context():
+    ledger = dict(db.session.query(models.PointsLog.user_id, func.sum(models.PointsLog.delta))
+                  .group_by(models.PointsLog.user_id).all())
+    balances = {b.user_id: b.balance for b in models.PointsBalance.query.all()}
+    redemptions = models.Redemption.query.count()
+print(json.dumps({"elapsed": elapsed, "ok": ok[0], "refused": refused[0], "errors": errors[0],
+                  "overdrawn": sum(1 for v in ledger.values() if v < 0),
+                  "drift": sum(1 for uid, v in ledger.items() if balances.get(uid) != v),
+                  "over_stock": max(redemptions - stock, 0)}))
+'''
+
+
+def _run(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   TASK_BROKER='eager', SQL_METRICS='0')
+        out = subprocess.run([sys.executable, '-c', _WORKER, mode, str(args.threads), str(args.attempts),
+                              str(args.users), str(args.stock)],
+                             cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=40, help="redemptions attempted per thread")
+    parser.add_argument('--users', type=int, default=4, help="users shared by the threads")
+    parser.add_argument('--stock', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.attempts} attempts over {args.users} users, stock {args.stock}\n")
+    print(f"{'mode':<18} {'attempts/s':>10} {'redeemed/s':>10} {'ok':>5} {'refused':>8} {'errors':>7} "
+          f"{'overdrawn':>9} {'drift':>6} {'over stock':>10}")
+    failed = False
+    for mode in ('check-then-insert', 'atomic'):
+        r = _run(mode, args)
+        attempts = r['ok'] + r['refused'] + r['errors']
+        print(f"{mode:<18} {attempts / r['elapsed']:>10.0f} {r['ok'] / r['elapsed']:>10.0f} {r['ok']:>5} "
+              f"{r['refused']:>8} {r['errors']:>7} {r['overdrawn']:>9} {r['drift']:>6} {r['over_stock']:>10}")
+        if mode == 'atomic' and (r['overdrawn'] or r['drift'] or r['over_stock'] or r['errors']):
+            failed = True
+    if failed:
+        print("\n❌ atomic redemption broke an invariant")
+        sys.exit(1)
+    print("\n✅ atomic redemption: no overdrafts, no drift, stock respected")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Concurrent add_log throughput on a file-backed SQLite database.
+
+    python benchmarks/bench_sqlite_writes.py [--threads 16] [--writes 50]
+
+Runs the same workload (every thread posts --writes plastic logs through
+plastic.add_log as its own user) against a fresh database in three
+configurations, each in its own interpreter:
+
+    baseline     SQLITE_TUNING=0 (rollback journal, default pragmas)
+    wal          SQLITE_TUNING=1 (WAL, busy_timeout, pool sizing)
+    wal+coalesce SQLITE_TUNING=1 WRITE_COALESCING=1
+
+and reports writes/s, p50/p95 latency and failed requests (the
+"database is locked" errors show up as 500s).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = (
+    ('baseline', {"SQLITE_TUNING": '0', "WRITE_COALESCING": '0'}),
+    ('wal', {"SQLITE_TUNING": '1', "WRITE_COALESCING": '0'}),
+    ('wal+coalesce', {"SQLITE_TUNING": '1', "WRITE_COALESCING": '1'}),
+)
+
+_WORKER = r'''
+import json, sys, threading, time
+threads, writes = int(sys.argv[1]), int(sys.argv[2])
+import main, models
+from app_setup import db
+app = main.app
+app.config['PROPAGATE_EXCEPTIONS'] = False  # count failures as 500s
+with app.app_context():
+    db.create_all()
+    db.session.add_all(models.User(id=n, username=f"w{n}", email=f"w{n}@bench", password='x')
+                       for n in range(1, threads + 1))
+    db.session.commit()
+
+latencies, failures = [], []
+barrier = threading.Barrier(threads)
+
+def worker(uid):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['_user_id'] = str(uid)
+        s['_fresh'] = True
+    barrier.wait()
+    for _ in range(writes):
+        start = time.perf_counter()
+        status = client.post('/plastic/plastic/add', data={'item': 'bottle', 'quantity': '1'}).status_code
+        latencies.append((time.perf_counter() - start) * 1000)
+        if status != 302:
+            failures.append(status)
+
+started = time.perf_counter()
+pool = [threading.Thread(target=worker, args=(n,)) for n in range(1, threads + 1)]
+for t in pool: t.start()
+for t in pool: t.join()
+elapsed = time.perf_counter() - started
+with app.app_context():
+    logs = models.PlasticLog.query.count()
+latencies.sort()
+print(json.dumps({"elapsed": elapsed, "logs": logs, "failures": len(failures),
+                  "p50": latencies[len(latencies) // 2], "p95": latencies[int(len(latencies) * 0.95)]}))
+'''
+
+
+def _run(mode_env, threads, writes):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   TASK_BROKER='eager', SQL_METRICS='0', **mode_env)
+        out = subprocess.run([sys.executable, '-c', _WORKER, str(threads), str(writes)], cwd=APP_DIR,
+                             env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=50, help='posts per thread')
+    args = parser.parse_args()
+
+    total = args.threads * args.writes
+    print(f"{args.threads} threads x {args.writes} writes\n")
+    print(f"{'mode':<14}{'writes/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'failed':>8}{'stored':>8}")
+    for name, env in MODES:
+        r = _run(env, args.threads, args.writes)
+        print(f"{name:<14}{total / r['elapsed']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}"
+              f"{r['failures']:>8}{r['logs']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark: import time per module and time to first request.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 1500]
+
+Each run starts a fresh interpreter that imports `main` and serves one
+request to /auth/login through the test client. Exits non-zero when the
+median time-to-first-request exceeds the budget (COLD_START_BUDGET_MS, or
+--budget-ms), or when a heavy optional dependency is imported at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only ever imported on first use, never by `import main`
+LAZY_MODULES = ('matplotlib', 'numpy', 'celery', 'redis')
+
+_PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+main.app.test_client().get('/auth/login')
+t2 = time.perf_counter()
+heavy = sorted(m for m in sys.modules if m.split('.')[0] in %r)
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_request_ms": (t2 - t0) * 1000, "heavy": heavy}))
+''' % (LAZY_MODULES,)
+
+
+def _run_probe(env):
+    out = subprocess.run([sys.executable, '-c', _PROBE], cwd=APP_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _module_import_times(env, top=15):
+    """Cumulative import time (ms) per module from `python -X importtime`."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                         cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    local = {os.path.splitext(f)[0] for f in os.listdir(APP_DIR) if f.endswith('.py')} | {'routes'}
+    times = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        times.append((int(cumulative) / 1000, name, name.split('.')[0] in local))
+    project = sorted((t for t in times if t[2]), reverse=True)
+    third_party = sorted((t for t in times if not t[2] and '.' not in t[1]), reverse=True)[:top]
+    return project, third_party
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.getenv('COLD_START_BUDGET_MS', '1500')))
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite://')  # never touch the real database
+
+    project, third_party = _module_import_times(env)
+    print("Project modules (cumulative import ms):")
+    for ms, name, _ in project:
+        print(f"  {name:<28}{ms:>8.1f}")
+    print("Heaviest third-party packages:")
+    for ms, name, _ in third_party:
+        print(f"  {name:<28}{ms:>8.1f}")
+
+    runs = [_run_probe(env) for _ in range(args.runs)]
+    import_ms = statistics.median(r['import_ms'] for r in runs)
+    first_ms = statistics.median(r['first_request_ms'] for r in runs)
+    print(f"\nimport main:          {import_ms:8.1f} ms (median of {args.runs})")
+    print(f"time to first request: {first_ms:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    heavy = sorted({m.split('.')[0] for r in runs for m in r['heavy']})
+    if heavy:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(heavy)}")
+        failed = True
+    if first_ms > args.budget_ms:
+        print("❌ Cold-start budget exceeded")
+        failed = True
+    if not failed:
+        print("✅ Within cold-start budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Load test the main pages against a synthetic dataset.
+
+    python benchmarks/loadtest.py seed --db /tmp/zp_load.db --users 100000 --logs 10000000
+    python benchmarks/loadtest.py run --db /tmp/zp_load.db [--requests 200] [--concurrency 8] [--server]
+    python benchmarks/loadtest.py run --db /tmp/zp_load.db --save-baseline benchmarks/baseline.json
+    python benchmarks/loadtest.py run --db /tmp/zp_load.db --baseline benchmarks/baseline.json
+
+`seed` builds a fresh, fully-migrated database with bulk inserts: users with a
+skewed activity distribution, teams, challenges, rewards, one PointsLog per
+PlasticLog, and the derived tables (balances, rollups, team stats).
+`run` drives /dashboard, /community, /admin, /challenge/<id> and /rewards
+through the Flask test client (or a local threaded WSGI server with
+--server) and reports p50/p95/p99 latency and throughput per endpoint.
+With --baseline it exits non-zero when p95 or throughput regress by more
+than --tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'loadtest'
+ITEMS = (('bottle', 40), ('bag', 25), ('cup', 20), ('straw', 10), ('container', 5))
+BATCH = 20000
+
+ENDPOINTS = (
+    # name, path, who
+    ('dashboard', '/dashboard', 'user'),
+    ('community', '/community/community', 'user'),
+    ('admin', '/admin/admin', 'admin'),
+    ('challenge', '/challenge/{challenge_id}', 'user'),
+    ('rewards', '/rewards/rewards', 'user'),
+)
+
+
+def _load_app(db_path):
+    # config.py reads DATABASE_URL at import time
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(db_path)}"
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    import main
+    return main.app
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, rows):
+    from app_setup import db
+    count = 0
+    for batch in _batches(rows):
+        db.session.execute(model.__table__.insert(), batch)
+        count += len(batch)
+    return count
+
+
+# -----------------------------
+# seed
+# -----------------------------
+def seed(args):
+    if os.path.exists(args.db):
+        if not args.force:
+            sys.exit(f"{args.db} exists; pass --force to replace it")
+        os.remove(args.db)
+    app = _load_app(args.db)
+    from app_setup import db, init_migrations
+    import models
+    import impact
+    import rollups
+    from flask_migrate import stamp
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    with app.app_context():
+        init_migrations(app)
+        db.create_all()
+        stamp()
+        conn = db.session.connection()
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+        conn.exec_driver_sql('PRAGMA journal_mode=MEMORY')
+
+        impact.seed_item_types()
+        _bulk_insert(models.User, (
+            {"id": uid, "username": 'admin' if uid == 1 else f"user{uid}", "email": f"user{uid}@load.test",
+             "password": PASSWORD, "role": 'admin' if uid == 1 else 'user'}
+            for uid in range(1, args.users + 1)))
+
+        n_teams = max(1, args.users // 50)
+        _bulk_insert(models.Team, ({"id": t, "name": f"Team {t}"} for t in range(1, n_teams + 1)))
+        _bulk_insert(models.TeamMembership, (
+            {"user_id": uid, "team_id": rng.randint(1, n_teams), "created_at": now}
+            for uid in range(2, args.users + 1) if rng.random() < 0.7))
+
+        _bulk_insert(models.Challenge, (
+            {"id": c, "name": f"Challenge {c}", "description": '', "points_bonus": 10,
+             "start_date": now - timedelta(days=30 * c), "end_date": now + timedelta(days=7)}
+            for c in range(1, args.challenges + 1)))
+        _bulk_insert(models.ChallengeParticipation, (
+            {"challenge_id": c, "user_id": uid, "joined_at": now, "completed": False}
+            for c in range(1, args.challenges + 1)
+            for uid in range(2, args.users + 1) if rng.random() < 0.05))
+        _bulk_insert(models.Reward, (
+            {"name": f"Reward {r}", "cost_points": 50 * r, "description": ''} for r in range(1, 6)))
+
+        # A few users log most of the plastic: pareto-distributed weights
+        user_ids = list(range(2, args.users + 1))
+        weights = [rng.paretovariate(1.2) for _ in user_ids]
+        item_names, item_weights = zip(*ITEMS)
+        span = args.days * 86400
+
+        def logs():
+            remaining = args.logs
+            while remaining:
+                k = min(BATCH, remaining)
+                remaining -= k
+                for uid, item in zip(rng.choices(user_ids, weights, k=k), rng.choices(item_names, item_weights, k=k)):
+                    yield uid, item, rng.randint(1, 5), now - timedelta(seconds=rng.random() * span)
+
+        plastic, points = [], []
+        for uid, item, qty, at in logs():
+            plastic.append({"user_id": uid, "item": item, "quantity": qty, "created_at": at})
+            points.append({"user_id": uid, "delta": qty, "reason": 'plastic_log', "created_at": at})
+            if len(plastic) == BATCH:
+                _bulk_insert(models.PlasticLog, plastic)
+                _bulk_insert(models.PointsLog, points)
+                plastic, points = [], []
+        _bulk_insert(models.PlasticLog, plastic)
+        _bulk_insert(models.PointsLog, points)
+        db.session.commit()
+
+        db.session.execute(models.PointsBalance.__table__.insert().from_select(
+            ['user_id', 'balance'],
+            db.select(models.PointsLog.user_id, db.func.sum(models.PointsLog.delta))
+            .group_by(models.PointsLog.user_id)))
+        rollups.backfill()
+        rollups.rebuild_team_stats()
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+    print(f"Seeded {args.users} users, {args.logs} plastic + points logs, {n_teams} teams, "
+          f"{args.challenges} challenges in {time.perf_counter() - started:.1f}s -> {args.db}")
+
+
+# -----------------------------
+# run
+# -----------------------------
+class _ServerClient:
+    """Minimal cookie-keeping client for the --server mode."""
+
+    def __init__(self, base):
+        import http.cookiejar
+        import urllib.request
+        self.base = base
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def get(self, path):
+        import urllib.error
+        try:
+            with self.opener.open(self.base + path) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def login(self, email):
+        import urllib.parse
+        data = urllib.parse.urlencode({"email": email, "password": PASSWORD}).encode()
+        with self.opener.open(self.base + '/auth/login', data=data) as resp:
+            resp.read()
+
+
+class _TestClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def login(self, email):
+        self.client.post('/auth/login', data={"email": email, "password": PASSWORD})
+
+
+def _percentile(sorted_ms, p):
+    if not sorted_ms:
+        return 0.0
+    k = (len(sorted_ms) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+
+def _drive(make_client, emails, path, requests, concurrency, warmup):
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+            local.client.login(random.choice(emails))
+        return local.client
+
+    def one(_):
+        c = client()
+        start = time.perf_counter()
+        status = c.get(path)
+        return (time.perf_counter() - start) * 1000, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup * concurrency)))
+        started = time.perf_counter()
+        results = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+    latencies = sorted(ms for ms, _ in results)
+    return {
+        "count": len(results),
+        "errors": sum(1 for _, status in results if status >= 400),
+        "p50": round(_percentile(latencies, 50), 2),
+        "p95": round(_percentile(latencies, 95), 2),
+        "p99": round(_percentile(latencies, 99), 2),
+        "rps": round(len(results) / elapsed, 1),
+    }
+
+
+def run(args):
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found; create it with `loadtest.py seed --db {args.db}`")
+    app = _load_app(args.db)
+    import models
+    with app.app_context():
+        users = models.User.query.count()
+        logs = models.PlasticLog.query.count()
+        challenge_id = models.Challenge.query.with_entities(models.Challenge.id).order_by(models.Challenge.id).first()
+        user_emails = [e for (e,) in models.User.query.with_entities(models.User.email)
+                       .filter(models.User.role == 'user').order_by(models.User.id).limit(args.sessions)]
+        admin_emails = [e for (e,) in models.User.query.with_entities(models.User.email)
+                        .filter(models.User.role == 'admin').limit(1)]
+
+    server = None
+    if args.server:
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        make_client = lambda: _ServerClient(base)  # noqa: E731
+    else:
+        make_client = lambda: _TestClient(app)  # noqa: E731
+
+    report = {}
+    try:
+        for name, path, who in ENDPOINTS:
+            if args.only and name not in args.only:
+                continue
+            if '{challenge_id}' in path:
+                if not challenge_id:
+                    continue
+                path = path.format(challenge_id=challenge_id[0])
+            emails = admin_emails if who == 'admin' else user_emails
+            report[name] = _drive(make_client, emails, path, args.requests, args.concurrency, args.warmup)
+    finally:
+        if server:
+            server.shutdown()
+
+    meta = {"users": users, "logs": logs, "requests": args.requests, "concurrency": args.concurrency,
+            "mode": 'server' if args.server else 'test-client'}
+    print(f"{meta['users']} users, {meta['logs']} logs, {args.requests} requests x {args.concurrency} "
+          f"workers ({meta['mode']})\n")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("logs") != logs:
+            print(f"⚠️  Baseline was recorded against {baseline['meta'].get('logs')} logs\n")
+
+    print(f"{'endpoint':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}"
+          + (f"{'p95 vs base':>14}" if baseline else ''))
+    regressions = []
+    for name, r in report.items():
+        line = f"{name:<12}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['rps']:>10.1f}{r['errors']:>8}"
+        base = baseline and baseline["endpoints"].get(name)
+        if base:
+            change = (r['p95'] - base['p95']) / base['p95'] * 100 if base['p95'] else 0.0
+            line += f"{change:>+13.0f}%"
+            if r['p95'] > base['p95'] * (1 + args.tolerance) or r['rps'] < base['rps'] * (1 - args.tolerance):
+                regressions.append(name)
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({"meta": meta, "endpoints": report}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    failed = False
+    if any(r['errors'] for r in report.values()):
+        print("\n❌ Some requests failed")
+        failed = True
+    if regressions:
+        print(f"\n❌ Regressed more than {args.tolerance:.0%} against the baseline: {', '.join(regressions)}")
+        failed = True
+    elif baseline:
+        print("\n✅ Within baseline tolerance")
+    sys.exit(1 if failed else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('seed', help='build a synthetic database')
+    p.add_argument('--db', required=True)
+    p.add_argument('--users', type=int, default=2000)
+    p.add_argument('--logs', type=int, default=100000, help='PlasticLog rows (and as many PointsLog rows)')
+    p.add_argument('--challenges', type=int, default=5)
+    p.add_argument('--days', type=int, default=180, help='spread logs over this many days')
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--force', action='store_true', help='replace an existing database')
+    p.set_defaults(func=seed)
+
+    p = sub.add_parser('run', help='drive the main pages and report latency')
+    p.add_argument('--db', required=True)
+    p.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    p.add_argument('--concurrency', type=int, default=8)
+    p.add_argument('--warmup', type=int, default=2, help='unmeasured requests per worker')
+    p.add_argument('--sessions', type=int, default=50, help='distinct users to log in as')
+    p.add_argument('--only', nargs='*', help='endpoint names to run')
+    p.add_argument('--server', action='store_true', help='go through a local threaded WSGI server')
+    p.add_argument('--save-baseline', metavar='PATH')
+    p.add_argument('--baseline', metavar='PATH', help='compare against a saved baseline')
+    p.add_argument('--tolerance', type=float, default=0.5, help='allowed regression (0.5 = 50%%; p95 is noisy)')
+    p.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
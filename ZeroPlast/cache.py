@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from flask import current_app, g, has_app_context
+from app_setup import shared_cache
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Keeps hit/miss counters so callers can see how well it is doing.
+    """
+
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for `key`, calling `compute()` on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# -----------------------------
+# Stale-while-revalidate aggregates
+# -----------------------------
+_aggregate_stats = defaultdict(Counter)  # name -> hit / stale / miss / refresh counts
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def cached_aggregate(name, compute, scope='community', ttl=None, grace=None):
+    """
+    Return `compute()`'s value, cached in the shared Flask-Caching backend.
+    Entries are fresh for `ttl` seconds or until `invalidate(scope)`; after
+    that they are still served for `grace` seconds while one background
+    thread recomputes them, so bursts of traffic never queue behind a refresh.
+    With grace=0 a stale entry is recomputed before returning.
+    """
+    ttl = current_app.config['AGGREGATE_CACHE_TTL'] if ttl is None else ttl
+    grace = current_app.config['AGGREGATE_CACHE_GRACE'] if grace is None else grace
+    key, gen_key = f"agg:{name}", f"agg-gen:{scope}"
+    entry, generation = shared_cache.get_many(key, gen_key)
+    generation = generation or _new_generation(scope)
+    stats = _aggregate_stats[name.split(':')[0]]
+    if entry is not None:
+        value, computed_at, entry_generation = entry
+        age = time.time() - computed_at
+        if entry_generation == generation and age < ttl:
+            stats['hit'] += 1
+            return value
+        if grace > 0 and age < ttl + grace:
+            stats['stale'] += 1
+            _refresh_in_background(key, compute, generation, ttl + grace, stats)
+            return value
+    stats['miss'] += 1
+    return _store(key, compute, generation, ttl + grace)
+
+
+def _store(key, compute, generation, timeout):
+    value = _on_primary(compute)
+    shared_cache.set(key, (value, time.time(), generation), timeout=timeout)
+    return value
+
+
+def _on_primary(compute):
+    # Entries are shared by every user and count as fresh from now on, so
+    # don't compute them from a replica that may be missing recent writes
+    if not has_app_context() or not g.get('use_replica'):
+        return compute()
+    g.use_replica = False
+    try:
+        return compute()
+    finally:
+        g.use_replica = True
+
+
+def _refresh_in_background(key, compute, generation, timeout, stats):
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                _store(key, compute, generation, timeout)
+                stats['refresh'] += 1
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def invalidate(scope):
+    """Mark every aggregate in `scope` stale (they refresh on next read)."""
+    _new_generation(scope)
+
+
+def generation(scope):
+    """Current generation token of `scope`."""
+    return shared_cache.get(f"agg-gen:{scope}") or _new_generation(scope)
+
+
+def _new_generation(scope):
+    # Random tokens kept without expiry. A counter would restart once its key
+    # was evicted and could match entries cached before; a missing key gets a
+    # new token instead, so at worst entries are recomputed
+    token = uuid.uuid4().hex
+    shared_cache.set(f"agg-gen:{scope}", token, timeout=0)
+    return token
+
+
+def aggregate_cache_stats() -> dict:
+    return {name: dict(counts) for name, counts in _aggregate_stats.items()}
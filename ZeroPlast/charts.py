@@ -0,0 +1,193 @@
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+from xml.sax.saxutils import escape
+from flask import current_app
+
+BAR_COLORS = ['#16a34a', '#22c55e', '#a3e635']
+
+# Files written by cached_chart: <kind>_<digest>.<ext>
+_CACHED_NAME = re.compile(r'^[a-z]+_[0-9a-f]{16}\.(png|svg)$')
+
+
+def chart_digest(kind, data) -> str:
+    """Stable hash of a chart's kind and aggregated input data."""
+    payload = json.dumps([kind, data], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def chart_file(kind, data, ext='png'):
+    """(static path, filesystem path) of the cached chart for `data`; the file may not exist yet."""
+    name = f"{kind}_{chart_digest(kind, data)}.{ext}"
+    return os.path.join('static', 'graphs', name), os.path.join(current_app.static_folder, 'graphs', name)
+
+
+def cached_chart(kind, data, render, ext='png'):
+    """
+    Return the static path of the chart for `data`, rendering it only when no
+    file with the same content hash exists yet.
+    `render(path)` must write the chart to `path`; it is given a temp file that
+    is atomically renamed into place, so readers never see a partial image.
+    """
+    static_path, target = chart_file(kind, data, ext)
+    graphs_dir = os.path.dirname(target)
+    if os.path.exists(target):
+        os.utime(target)  # mark as recently used for eviction
+    else:
+        os.makedirs(graphs_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=graphs_dir, suffix=f'.{ext}.tmp')
+        os.close(fd)
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        evict_charts(graphs_dir)
+    return static_path
+
+
+def evict_charts(graphs_dir, max_files=None, max_bytes=None):
+    """Delete least recently used cached charts until the cache fits its bounds."""
+    max_files = max_files or current_app.config['GRAPH_CACHE_MAX_FILES']
+    max_bytes = max_bytes or current_app.config['GRAPH_CACHE_MAX_BYTES']
+    entries = []
+    for entry in os.scandir(graphs_dir):
+        if _CACHED_NAME.match(entry.name):
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    entries.sort()  # oldest first
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    while entries and (len(entries) > max_files or total > max_bytes):
+        _, size, path = entries.pop(0)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # another worker evicted it first
+        total -= size
+        removed += 1
+    return removed
+
+
+# -----------------------------
+# SVG / JSON renderers
+# -----------------------------
+def chart_series(labels, values) -> dict:
+    """Plain JSON series for templates or API clients that draw their own charts."""
+    return {"labels": [str(l) for l in labels], "values": [v for v in values]}
+
+
+def _nice_ticks(max_value, count=5):
+    """Round tick values covering 0..max_value, e.g. [0, 20, 40, 60]."""
+    if max_value <= 0:
+        return [0, 1]
+    raw = max_value / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    return [i * step for i in range(int(math.ceil(max_value / step)) + 1)]
+
+
+def _svg_frame(width, height, title, ylabel, ticks, box):
+    """Open an <svg> document with title, y label, grid lines and y tick labels."""
+    left, top, plot_w, plot_h = box
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}" style="max-width:100%;height:auto" '
+             f'font-family="sans-serif" font-size="12">',
+             f'<rect width="{width}" height="{height}" fill="#fff"/>']
+    if title:
+        parts.append(f'<text x="{width / 2:.0f}" y="24" text-anchor="middle" font-size="15">{escape(title)}</text>')
+    if ylabel:
+        parts.append(f'<text transform="translate(16 {top + plot_h / 2:.0f}) rotate(-90)" '
+                     f'text-anchor="middle">{escape(ylabel)}</text>')
+    for t in ticks:
+        y = top + plot_h - plot_h * t / ticks[-1]
+        parts.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_w}" y2="{y:.1f}" stroke="#e5e7eb"/>')
+        parts.append(f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end">{t:g}</text>')
+    parts.append(f'<line x1="{left}" y1="{top}" x2="{left}" y2="{top + plot_h}" stroke="#374151"/>')
+    parts.append(f'<line x1="{left}" y1="{top + plot_h}" x2="{left + plot_w}" y2="{top + plot_h}" stroke="#374151"/>')
+    return parts
+
+
+def svg_bar_chart(labels, values, title='', ylabel='', colors=BAR_COLORS, width=640, height=480) -> str:
+    """Render a simple vertical bar chart as an SVG string."""
+    left, right, top, bottom = 64, 20, 44, 48
+    plot_w, plot_h = width - left - right, height - top - bottom
+    ticks = _nice_ticks(max(values, default=0))
+    parts = _svg_frame(width, height, title, ylabel, ticks, (left, top, plot_w, plot_h))
+    slot = plot_w / max(len(values), 1)
+    for i, (label, value) in enumerate(zip(labels, values)):
+        bar_h = plot_h * value / ticks[-1]
+        x = left + i * slot + slot * 0.2
+        parts.append(f'<rect x="{x:.1f}" y="{top + plot_h - bar_h:.1f}" width="{slot * 0.6:.1f}" '
+                     f'height="{bar_h:.1f}" fill="{colors[i % len(colors)]}"/>')
+        parts.append(f'<text x="{x + slot * 0.3:.1f}" y="{top + plot_h + 18}" '
+                     f'text-anchor="middle">{escape(str(label))}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def svg_line_chart(labels, values, title='', xlabel='', ylabel='', color='#2563eb',
+                   width=800, height=400) -> str:
+    """Render a line chart with point markers as an SVG string."""
+    left, right, top, bottom = 64, 24, 44, 90
+    plot_w, plot_h = width - left - right, height - top - bottom
+    ticks = _nice_ticks(max(values, default=0))
+    parts = _svg_frame(width, height, title, ylabel, ticks, (left, top, plot_w, plot_h))
+    step = plot_w / max(len(values) - 1, 1)
+    label_every = max(1, math.ceil(len(labels) / 12))  # keep x labels readable
+    points = []
+    for i, (label, value) in enumerate(zip(labels, values)):
+        x, y = left + i * step, top + plot_h - plot_h * value / ticks[-1]
+        points.append(f'{x:.1f},{y:.1f}')
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{color}"/>')
+        if i % label_every == 0:
+            parts.append(f'<text transform="translate({x:.1f} {top + plot_h + 14}) rotate(-45)" '
+                         f'text-anchor="end">{escape(str(label))}</text>')
+    if points:
+        parts.append(f'<polyline points="{" ".join(points)}" fill="none" stroke="{color}" stroke-width="2"/>')
+    if xlabel:
+        parts.append(f'<text x="{left + plot_w / 2:.0f}" y="{height - 6}" text-anchor="middle">{escape(xlabel)}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def write_svg(svg, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(svg)
+
+
+# -----------------------------
+# Optional matplotlib export (offline only)
+# -----------------------------
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-GUI backend for thread/process safety
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def export_bar_png(labels, values, title, path, ylabel='Total Logged', colors=BAR_COLORS):
+    """Write a bar chart PNG with matplotlib (must be installed)."""
+    plt = _pyplot()
+    fig, ax = plt.subplots()
+    ax.bar(labels, values, color=colors)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    plt.tight_layout()
+    plt.savefig(path, format='png')
+    plt.close(fig)
+
+
+def export_line_png(labels, values, title, path, xlabel='Date', ylabel='Items Processed'):
+    """Write a line chart PNG with matplotlib (must be installed)."""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.plot(labels, values, marker='o', linestyle='-', color='b')
+    ax.set(xlabel=xlabel, ylabel=ylabel, title=title)
+    plt.xticks(rotation=45, ha='right')
+    plt.savefig(path, format='png')
+    plt.close(fig)
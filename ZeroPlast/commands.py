@@ -0,0 +1,116 @@
+import click
+import rollups
+from query_plans import check_query_plans
+from leaderboard import rebuild_leaderboard
+from utils import reconcile_points
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app's `flask` CLI."""
+
+    @app.cli.command('reconcile-points')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, do not rewrite balances.')
+    def reconcile_points_command(dry_run):
+        """Rebuild points balances from the PointsLog ledger and report drift."""
+        drift = reconcile_points(fix=not dry_run)
+        for user_id, stored, actual in drift:
+            click.echo(f"user {user_id}: stored={stored} ledger={actual}")
+        if not drift:
+            click.echo("✅ All balances match the ledger.")
+        elif dry_run:
+            click.echo(f"⚠️ {len(drift)} balance(s) drifted (dry run, nothing changed).")
+        else:
+            rebuild_leaderboard()
+            click.echo(f"✅ Rebuilt {len(drift)} balance(s) from the ledger.")
+
+    @app.cli.command('backfill-rollups')
+    def backfill_rollups_command():
+        """Rebuild the daily item and points rollups from the log tables."""
+        items, points = rollups.backfill()
+        click.echo(f"✅ Rebuilt {items} (day, item) rollup(s) and {points} daily points rollup(s).")
+
+    @app.cli.command('check-query-plans')
+    @click.option('-v', '--verbose', is_flag=True, help='Print every plan, not just failures.')
+    def check_query_plans_command(verbose):
+        """Fail if any hot query's SQLite plan degrades to a full table scan."""
+        failures = 0
+        for name, plan, scans in check_query_plans():
+            if scans:
+                failures += 1
+                click.echo(f"❌ {name}: full scan ({'; '.join(scans)})")
+            elif verbose:
+                click.echo(f"✅ {name}")
+            if verbose or scans:
+                for line in plan:
+                    click.echo(f"     {line}")
+        if failures:
+            raise SystemExit(1)
+        click.echo("✅ No hot query uses a full table scan.")
+
+    @app.cli.command('rebuild-leaderboard')
+    @click.option('--from-ledger', is_flag=True, help='Sum PointsLog instead of reading PointsBalance.')
+    def rebuild_leaderboard_command(from_ledger):
+        """Reload the global leaderboard (only needed for the shared Redis board)."""
+        users = rebuild_leaderboard(from_ledger=from_ledger)
+        click.echo(f"✅ Leaderboard rebuilt with {users} user(s).")
+
+    @app.cli.command('rebuild-team-stats')
+    def rebuild_team_stats_command():
+        """Recompute team member counts and points from memberships and the ledger."""
+        teams = rollups.rebuild_team_stats()
+        click.echo(f"✅ Rebuilt stats for {teams} team(s).")
+
+    @app.cli.command('run-tasks')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty instead of polling.')
+    @click.option('--poll', default=1.0, show_default=True, help='Seconds between polls of an empty queue.')
+    def run_tasks_command(burst, poll):
+        """Work through jobs queued with TASK_BROKER=sqlite."""
+        import time
+        from tasks import run_sqlite_jobs
+        while True:
+            done, failed = run_sqlite_jobs()
+            if done or failed:
+                click.echo(f"ran {done} job(s), {failed} failed")
+            if burst:
+                break
+            time.sleep(poll)
+
+    @app.cli.command('sync-replica')
+    @click.option('--every', type=float, default=None, help='Keep syncing every N seconds instead of once.')
+    def sync_replica_command(every):
+        """Copy the primary SQLite database to the REPLICA_DATABASE_URL file."""
+        import time
+        from replica import sync_sqlite_replica
+        while True:
+            stamped = sync_sqlite_replica()
+            click.echo(f"✅ Replica synced at {stamped:%Y-%m-%d %H:%M:%S} UTC.")
+            if every is None:
+                break
+            time.sleep(every)
+
+    @app.cli.command('archive-logs')
+    @click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Archive whole months before this date (default: ARCHIVE_AFTER_DAYS ago).')
+    @click.option('--batch', type=int, default=None, help='Rows per archive file (default: ARCHIVE_BATCH_ROWS).')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches; rerun to resume.')
+    @click.option('--dry-run', is_flag=True, help='Only count the rows that would be archived.')
+    @click.option('--rebuild-monthly-points', is_flag=True,
+                  help='Rebuild the per-user monthly points totals from the points archive files.')
+    def archive_logs_command(before, batch, max_batches, dry_run, rebuild_monthly_points):
+        """Move old PlasticLog / PointsLog rows into monthly archive files."""
+        from datetime import datetime
+        import archive
+        if rebuild_monthly_points:
+            click.echo(f"✅ Rebuilt monthly points from {archive.rebuild_monthly_points()} archived row(s).")
+            return
+        before = datetime(before.year, before.month, 1) if before else archive.horizon()
+        counts = archive.pending(before)
+        click.echo(f"{counts['plastic']} plastic and {counts['points']} points row(s) older than {before:%Y-%m-%d}.")
+        if dry_run:
+            return
+        archived = 0
+        for entry in archive.archive_logs(before, batch, max_batches):
+            archived += entry.rows
+            click.echo(f"  {entry.kind} {entry.month:%Y-%m}: {entry.rows} row(s) -> {entry.path}")
+        left = sum(archive.pending(before).values())
+        click.echo(f"✅ Archived {archived} row(s)" + (f"; {left} left, run again to continue." if left else "."))
@@ -4,6 +4,46 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-dev-dev")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///zeroplast.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"  # WAL + pragmas + pool sizing (see app_setup.py)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "32000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "10"))
+    REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")  # unset = no replica; "readonly" or a URL (see replica.py)
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30"))  # seconds a replica read may be behind
+    REPLICA_ROUTE_MAX_LAG = {endpoint: float(lag) for endpoint, lag in  # e.g. "admin.admin=300,community.community_page=10"
+                             (pair.split('=') for pair in os.getenv("REPLICA_ROUTE_MAX_LAG", "").split(',') if pair)}
+    WRITE_COALESCING = os.getenv("WRITE_COALESCING", "0") == "1"  # group add_log writes (see write_queue.py)
+    WRITE_COALESCE_WINDOW_MS = float(os.getenv("WRITE_COALESCE_WINDOW_MS", "2"))
+    WRITE_COALESCE_MAX = int(os.getenv("WRITE_COALESCE_MAX", "200"))
+    SCAN_DEDUP_WINDOW = float(os.getenv("SCAN_DEDUP_WINDOW", "10"))  # seconds a repeated scan counts as a duplicate; 0 = off
+    SCAN_DEDUP_MAX_KEYS = int(os.getenv("SCAN_DEDUP_MAX_KEYS", "100000"))  # open windows kept per process
+    SCAN_DEDUP_SHARED = os.getenv("SCAN_DEDUP_SHARED", "0") == "1"  # also claim windows in shared_cache (see dedup.py)
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")  # e.g. RedisCache + CACHE_REDIS_URL
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    AGGREGATE_CACHE_TTL = int(os.getenv("AGGREGATE_CACHE_TTL", "60"))  # seconds until stale
+    AGGREGATE_CACHE_GRACE = int(os.getenv("AGGREGATE_CACHE_GRACE", "300"))  # serve stale while refreshing
+    LEADERBOARD_PAGE_SIZE = int(os.getenv("LEADERBOARD_PAGE_SIZE", "25"))
+    LEADERBOARD_CACHE_TTL = int(os.getenv("LEADERBOARD_CACHE_TTL", "30"))  # seconds
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "60"))  # seconds other workers may see a stale user/role
+    LEADERBOARD_REDIS_URL = os.getenv("LEADERBOARD_REDIS_URL")  # unset = in-process board
+    LEADERBOARD_REBUILD_INTERVAL = int(os.getenv("LEADERBOARD_REBUILD_INTERVAL", "300"))  # seconds
+    TEAM_MEMBERS_SHOWN = int(os.getenv("TEAM_MEMBERS_SHOWN", "10"))  # newest members listed per team on /teams
+    GRAPH_CACHE_MAX_FILES = int(os.getenv("GRAPH_CACHE_MAX_FILES", "500"))
+    GRAPH_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+    LOGS_API_MAX_LIMIT = int(os.getenv("LOGS_API_MAX_LIMIT", "200"))
+    BULK_INGEST_MAX_EVENTS = int(os.getenv("BULK_INGEST_MAX_EVENTS", "5000"))
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))  # logs older than this (whole months) get archived
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")  # default: <instance>/archive
+    ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", "20000"))  # rows per archive file / transaction
+    REDEEM_MAX_RETRIES = int(os.getenv("REDEEM_MAX_RETRIES", "5"))  # attempts when the database is busy
+    ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", "1000"))  # per /api/analytics/timeseries call
+    SQL_METRICS = os.getenv("SQL_METRICS", "1") == "1"  # per-request query counts and timings
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))  # same statement more often = N+1 warning
+    SQL_METRICS_HEADERS = os.getenv("SQL_METRICS_HEADERS") == "1"  # X-DB-* headers (always on with DEBUG)
+    TASK_BROKER = os.getenv("TASK_BROKER", "thread")  # eager | thread | sqlite | celery (see tasks.py)
+    TASK_WORKERS = int(os.getenv("TASK_WORKERS", "2"))  # threads for the thread broker
+    CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 
 class DevConfig(Config): DEBUG = True
 class ProdConfig(Config): DEBUG = False
@@ -25,15 +25,38 @@ def seed_sample_data_for_impact():
                 db.session.add(log)
     db.session.commit()
     print("✅ Sample users and logs seeded.")
-from app_setup import create_app, db
+def seed_smart_bins():
+    """Seed the item catalog and the campus smart bins. Idempotent."""
+    impact.seed_item_types()
+    bins = {
+        'BIN001': ('bottle', 'Plastic Bottle'),
+        'BIN002': ('bag', 'Plastic Bag'),
+        'BIN003': ('container', 'Food Container'),
+    }
+    for bin_code, (key, display_name) in bins.items():
+        item_type = models.ItemType.query.filter_by(key=key).first()
+        if not item_type:
+            item_type = models.ItemType(key=key, display_name=display_name)
+            db.session.add(item_type)
+            db.session.flush()
+        if not models.SmartBin.query.filter_by(bin_code=bin_code).first():
+            db.session.add(models.SmartBin(bin_code=bin_code, item_type_id=item_type.id))
+    db.session.commit()
+    print("✅ Smart bins seeded.")
+from app_setup import create_app, db, init_migrations
 import models
+import impact
 from werkzeug.security import generate_password_hash
 
 app = create_app()
+init_migrations(app)
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        # create_all builds the latest schema, so mark it as fully migrated
+        from flask_migrate import stamp
+        stamp()
         print("✅ Database and tables created.")
 
         # Seed admin user
@@ -52,5 +75,11 @@ if __name__ == '__main__':
         else:
             print("ℹ️ Admin user already exists.")
 
+        seed_smart_bins()
+
         # Seed sample data for impact/awareness
-        seed_sample_data_for_impact()
\ No newline at end of file
+        seed_sample_data_for_impact()
+
+        # Sample logs are inserted directly, so rebuild the daily rollups
+        import rollups
+        rollups.backfill()
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Duplicate scan suppression.
+
+At a busy bin a double scan or a client retry posts the same log twice
+within a few seconds. For scans (posts with a bin code) add_log asks
+`claim(user_id, bin_code)` first: the first claim for a (user, bin) pair
+opens a SCAN_DEDUP_WINDOW-second window, and later claims inside it are
+duplicates, which never reach the database. Manual logs aren't deduplicated;
+logging the same item twice in a row is legitimate.
+
+Windows live in a bounded per-process map (SCAN_DEDUP_MAX_KEYS entries, the
+oldest dropped first). With SCAN_DEDUP_SHARED=1 they are also claimed in the
+shared Flask-Caching backend (an atomic add), so all workers share them;
+that only helps with a cross-process backend like RedisCache. If the shared
+backend is unavailable, scans are let through rather than lost.
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import current_app
+from app_setup import shared_cache
+
+log = logging.getLogger(__name__)
+
+
+class WindowMap:
+    """Thread-safe map of key -> expiry holding at most `maxsize` open windows."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.evicted = 0
+        self._windows = OrderedDict()  # insertion order == expiry order, windows are never extended
+        self._lock = threading.Lock()
+
+    def claim(self, key, window) -> bool:
+        """Open a window for `key`; False if one is already open."""
+        now = time.monotonic()
+        with self._lock:
+            while self._windows and next(iter(self._windows.values())) <= now:
+                self._windows.popitem(last=False)
+            if key in self._windows:
+                return False
+            self._windows[key] = now + window
+            while len(self._windows) > self.maxsize:
+                self._windows.popitem(last=False)
+                self.evicted += 1
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def __len__(self):
+        return len(self._windows)
+
+
+_windows = None
+_windows_lock = threading.Lock()
+_stats = Counter()  # claimed / duplicates / shared_errors
+
+
+def _local():
+    global _windows
+    with _windows_lock:
+        if _windows is None:
+            _windows = WindowMap(current_app.config['SCAN_DEDUP_MAX_KEYS'])
+    return _windows
+
+
+def _key(user_id, target):
+    return f"scan:{user_id}:{target.strip().lower()}"
+
+
+def claim(user_id, target) -> bool:
+    """
+    True if this scan should be written; False if it repeats one from the
+    last SCAN_DEDUP_WINDOW seconds. Call release() if the write then fails.
+    """
+    window = current_app.config['SCAN_DEDUP_WINDOW']
+    if window <= 0:
+        return True
+    key = _key(user_id, target)
+    fresh = _local().claim(key, window)
+    if fresh and current_app.config['SCAN_DEDUP_SHARED']:
+        try:
+            fresh = shared_cache.add(key, 1, timeout=max(1, math.ceil(window)))  # 0 would never expire
+        except Exception as e:
+            log.warning("Shared scan dedup unavailable, using the local window only: %s", e)
+            _stats['shared_errors'] += 1
+    _stats['claimed' if fresh else 'duplicates'] += 1
+    return fresh
+
+
+def release(user_id, target):
+    """Forget the window opened by claim(), so the failed scan can be retried."""
+    if current_app.config['SCAN_DEDUP_WINDOW'] <= 0:
+        return
+    key = _key(user_id, target)
+    _local().release(key)
+    if current_app.config['SCAN_DEDUP_SHARED']:
+        try:
+            shared_cache.delete(key)
+        except Exception:
+            pass
+
+
+def stats() -> dict:
+    """Scans written (claimed) and skipped (duplicates: each one a PlasticLog, a PointsLog and a commit saved)."""
+    windows = _windows
+    return {**{name: _stats[name] for name in ('claimed', 'duplicates', 'shared_errors')},
+            "open_windows": len(windows) if windows else 0,
+            "evicted": windows.evicted if windows else 0}
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import select
+import models
+from app_setup import db
+
+# kind -> (model, exported columns)
+EXPORTS = {
+    'plastic': (models.PlasticLog, ['id', 'user_id', 'item', 'quantity', 'created_at']),
+    'points': (models.PointsLog, ['id', 'user_id', 'delta', 'reason', 'created_at']),
+    'redemptions': (models.Redemption, ['id', 'user_id', 'reward_id', 'created_at']),
+}
+CHUNK_ROWS = 1000
+
+
+def export_query(kind, start=None, end=None, user_id=None, item=None):
+    """SELECT for an export, filtered by date range (inclusive days), user and item."""
+    model, columns = EXPORTS[kind]
+    stmt = select(*(getattr(model, c) for c in columns)).order_by(model.id)
+    if start:
+        stmt = stmt.where(model.created_at >= start)
+    if end:
+        stmt = stmt.where(model.created_at < end + timedelta(days=1))
+    if user_id:
+        stmt = stmt.where(model.user_id == user_id)
+    if item and hasattr(model, 'item'):
+        stmt = stmt.where(model.item == item)
+    return stmt
+
+
+def _rows(stmt, archived=()):
+    yield from archived  # row lists read back from archive files (archive.archived_rows)
+    # yield_per streams the result in chunks instead of buffering the table
+    result = db.session.execute(stmt.execution_options(yield_per=CHUNK_ROWS))
+    for partition in result.partitions():
+        yield partition
+
+
+def _value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def stream_csv(kind, stmt, archived=()):
+    columns = EXPORTS[kind][1]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for partition in _rows(stmt, archived):
+        writer.writerows([_value(v) for v in row] for row in partition)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def stream_ndjson(kind, stmt, archived=()):
+    columns = EXPORTS[kind][1]
+    for partition in _rows(stmt, archived):
+        yield ''.join(json.dumps(dict(zip(columns, map(_value, row)))) + '\n' for row in partition)
+
+
+def gzipped(chunks):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
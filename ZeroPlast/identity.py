@@ -0,0 +1,71 @@
+"""
+Cached identities for Flask-Login.
+
+The user loader runs on every authenticated request, but the app only ever
+reads `current_user.id`, `.username` and `.role` (plus the linked vendor).
+Identity carries just those, from one query, cached per process in a small
+LRU/TTL cache. Writes to User or Vendor rows drop the affected entries once
+their transaction commits; other workers catch up within IDENTITY_CACHE_TTL.
+"""
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+import models
+from app_setup import db
+from cache import TTLCache
+from signals import identity_changed, send_after_commit
+
+_identities = TTLCache(maxsize=4096)
+
+
+class Identity(UserMixin):
+    __slots__ = ('id', 'username', 'role', 'vendor_id')
+
+    def __init__(self, id, username, role, vendor_id=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.vendor_id = vendor_id  # Vendor row named after the user, if any
+
+    def __repr__(self):
+        return f"<Identity {self.id} {self.username!r} {self.role}>"
+
+
+def load_identity(user_id: int):
+    """Identity for `user_id` (None if there is no such user)."""
+    identity = _identities.get(user_id)
+    if identity is None:
+        row = db.session.query(models.User.id, models.User.username, models.User.role, models.Vendor.id) \
+            .outerjoin(models.Vendor, models.Vendor.name == models.User.username) \
+            .filter(models.User.id == user_id).first()
+        if row is None:
+            return None
+        identity = Identity(*row)
+        _identities.set(user_id, identity, current_app.config['IDENTITY_CACHE_TTL'])
+    return identity
+
+
+def identity_cache_stats() -> dict:
+    return _identities.stats()
+
+
+@event.listens_for(models.User, 'after_update')
+@event.listens_for(models.User, 'after_delete')
+def _on_user_write(mapper, connection, target):
+    send_after_commit(identity_changed, user_id=target.id)
+
+
+@event.listens_for(models.Vendor, 'after_insert')
+@event.listens_for(models.Vendor, 'after_update')
+@event.listens_for(models.Vendor, 'after_delete')
+def _on_vendor_write(mapper, connection, target):
+    # Vendors link to users by name; rare enough to just drop everything
+    send_after_commit(identity_changed, user_id=None)
+
+
+@identity_changed.connect
+def _on_identity_changed(sender, user_id=None, **kwargs):
+    if user_id is None:
+        _identities.clear()
+    else:
+        _identities.invalidate(user_id)
@@ -0,0 +1,159 @@
+"""
+Environmental impact of logged items.
+
+Per-item factors live in the ItemType catalog (plastic from `default_weight_kg`,
+plus `co2_kg` and `landfill_l`). ImpactEngine loads them once and reloads after
+the catalog changes. Single estimates (a user's or the community's items) are
+a few multiplications in plain Python; reports over every user or every day
+use a NumPy matrix built from the same factors, one vectorized pass instead of
+a Python loop per group. NumPy is only imported for those reports.
+"""
+import threading
+from sqlalchemy import event
+import models
+from app_setup import db
+from cache import invalidate
+from signals import catalog_changed, send_after_commit
+
+FACTORS = ('plastic_kg', 'co2_kg', 'landfill_l')
+MARINE_LIVES_PER_ITEM = 0.005
+
+# Seed values for the catalog: key -> (display name, plastic kg, CO2e kg, landfill litres)
+DEFAULT_ITEM_TYPES = {
+    'bottle':    ('Plastic Bottle', 0.02, 0.054, 0.05),
+    'bag':       ('Plastic Bag', 0.01, 0.027, 0.02),
+    'cup':       ('Plastic Cup', 0.015, 0.04, 0.03),
+    'straw':     ('Plastic Straw', 0.005, 0.01, 0.005),
+}
+
+
+def _numpy():
+    # numpy is heavy; keep it off the startup path
+    import numpy
+    return numpy
+
+
+class ImpactEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factors = None  # item key -> (plastic, co2, landfill)
+        self._matrix = None  # (factors it was built from, item key -> row, factor matrix)
+
+    def invalidate(self):
+        with self._lock:
+            self._factors = None
+            self._matrix = None
+
+    def factors(self) -> dict:
+        factors = self._factors
+        if factors is None:
+            rows = db.session.query(models.ItemType.key, models.ItemType.default_weight_kg,
+                                    models.ItemType.co2_kg, models.ItemType.landfill_l).all()
+            factors = {key.lower(): tuple(value or 0.0 for value in values) for key, *values in rows}
+            with self._lock:
+                self._factors = factors
+        return factors
+
+    def matrix(self):
+        factors = self.factors()
+        built = self._matrix
+        if built is None or built[0] is not factors:
+            np = _numpy()
+            index = {key: n for n, key in enumerate(factors)}
+            matrix = np.array(list(factors.values()), dtype=float).reshape(len(factors), len(FACTORS))
+            built = (factors, index, matrix)
+            with self._lock:
+                self._matrix = built
+        return built[1], built[2]
+
+    def estimate(self, counts: dict) -> dict:
+        """Impact of one {item: quantity} mapping."""
+        if not counts:
+            return _impact(0, 0, 0, 0)
+        factors = self.factors()
+        totals, items = [0.0] * len(FACTORS), 0
+        for item, qty in counts.items():
+            qty = qty or 0
+            items += qty
+            for n, factor in enumerate(factors.get((item or '').lower(), ())):
+                totals[n] += factor * qty
+        return _impact(*(round(total, 3) for total in totals),
+                       max(0, round(items * MARINE_LIVES_PER_ITEM, 2)))
+
+    def estimate_many(self, rows) -> dict:
+        """
+        Impact per group from (group, item, quantity) rows, e.g. one row per
+        (user_id, item) from a GROUP BY. Items missing from the catalog still
+        count towards marine_lives_saved but add no plastic/CO2/landfill.
+        """
+        np = _numpy()
+        index, matrix = self.matrix()
+        group_index, item_index, g, i, q = {}, {}, [], [], []
+        for group, item, qty in rows:
+            g.append(group_index.setdefault(group, len(group_index)))
+            i.append(item_index.setdefault(item, len(item_index)))
+            q.append(qty or 0)
+        if not group_index:
+            return {}
+        # Everything below is NumPy: sum quantities into a groups x items matrix,
+        # then one matrix product against the catalog factors
+        rows_for_item = np.asarray([index.get((item or '').lower(), len(index)) for item in item_index], dtype=np.intp)
+        table = np.vstack([matrix, np.zeros((1, len(FACTORS)))])  # last row: not in catalog
+        counts = np.bincount(np.asarray(g, dtype=np.intp) * len(item_index) + np.asarray(i, dtype=np.intp),
+                             weights=np.asarray(q, dtype=float), minlength=len(group_index) * len(item_index))
+        counts = counts.reshape(len(group_index), len(item_index))
+        totals = np.round(counts @ table[rows_for_item], 3).tolist()
+        marine = np.maximum(0, np.round(counts.sum(axis=1) * MARINE_LIVES_PER_ITEM, 2)).tolist()
+        return {group: _impact(*totals[n], marine[n]) for group, n in group_index.items()}
+
+
+def _impact(plastic_kg, co2_kg, landfill_l, marine_lives_saved):
+    return {"plastic_kg": plastic_kg, "co2_kg": co2_kg, "landfill_l": landfill_l,
+            "marine_lives_saved": marine_lives_saved}
+
+
+engine = ImpactEngine()
+
+
+def estimate(counts: dict) -> dict:
+    return engine.estimate(counts)
+
+
+def per_user(user_ids=None) -> dict:
+    """user_id -> impact for every user with logs (or just `user_ids`), from the per-user item rollups."""
+    r = models.UserItemRollup
+    query = db.session.query(r.user_id, r.item, r.quantity)
+    if user_ids is not None:
+        query = query.filter(r.user_id.in_(user_ids))
+    return engine.estimate_many(query)
+
+
+def per_day() -> dict:
+    """day -> impact, from the daily item rollups."""
+    r = models.DailyItemRollup
+    return engine.estimate_many(db.session.query(r.day, r.item, r.quantity).order_by(r.day))
+
+
+def seed_item_types():
+    """Add the default item types that are missing and fill in unset factors. Idempotent."""
+    existing = {t.key: t for t in models.ItemType.query.all()}
+    for key, (display_name, plastic_kg, co2_kg, landfill_l) in DEFAULT_ITEM_TYPES.items():
+        item_type = existing.get(key)
+        if item_type is None:
+            db.session.add(models.ItemType(key=key, display_name=display_name, default_weight_kg=plastic_kg,
+                                           co2_kg=co2_kg, landfill_l=landfill_l))
+        elif not item_type.co2_kg and not item_type.landfill_l:
+            item_type.default_weight_kg, item_type.co2_kg, item_type.landfill_l = plastic_kg, co2_kg, landfill_l
+
+
+@event.listens_for(models.ItemType, 'after_insert')
+@event.listens_for(models.ItemType, 'after_update')
+@event.listens_for(models.ItemType, 'after_delete')
+def _on_item_type_write(mapper, connection, target):
+    send_after_commit(catalog_changed)
+
+
+@catalog_changed.connect
+def _on_catalog_changed(sender, **kwargs):
+    engine.invalidate()
+    invalidate('community')
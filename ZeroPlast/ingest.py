@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+import models
+from app_setup import db
+from cache import TTLCache
+from utils import record_plastic_batch
+
+# bin_code -> ItemType.key (None if the bin has no item type), refreshed every few minutes
+_bin_items = TTLCache(maxsize=4096, ttl=300)
+_UNCACHED = object()
+_NOT_FOUND = object()  # cached marker for unknown bin codes
+
+
+class EventError(ValueError):
+    pass
+
+
+def resolve_bins(codes) -> dict:
+    """Map known bin codes to their item key via SmartBin/ItemType, caching the answers."""
+    resolved, missing = {}, []
+    for code in set(codes):
+        key = _bin_items.get(code, _UNCACHED)
+        if key is _UNCACHED:
+            missing.append(code)
+        elif key is not _NOT_FOUND:
+            resolved[code] = key
+    if missing:
+        found = dict(db.session.query(models.SmartBin.bin_code, models.ItemType.key)
+                     .outerjoin(models.ItemType, models.ItemType.id == models.SmartBin.item_type_id)
+                     .filter(models.SmartBin.bin_code.in_(missing)).all())
+        for code in missing:
+            key = found.get(code, _NOT_FOUND)
+            _bin_items.set(code, key)
+            if key is not _NOT_FOUND:
+                resolved[code] = key
+    return resolved
+
+
+def _parse_timestamp(value):
+    if value in (None, ''):
+        return datetime.utcnow()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    try:
+        ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise EventError("bad timestamp")
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _parse_event(raw, bins, user_id, allow_user):
+    if not isinstance(raw, dict):
+        raise EventError("event must be an object")
+    event_id = str(raw.get('event_id') or '').strip()
+    bin_code = str(raw.get('bin_code') or '').strip()
+    if not event_id or not bin_code:
+        raise EventError("event_id and bin_code are required")
+    if bin_code not in bins:
+        raise EventError("unknown bin")
+    item = str(raw.get('item') or bins[bin_code] or '').strip()
+    if not item:
+        raise EventError("item required (bin has no item type)")
+    try:
+        quantity = int(raw.get('quantity', 1))
+    except (TypeError, ValueError):
+        raise EventError("bad quantity")
+    if quantity < 1:
+        raise EventError("bad quantity")
+    if allow_user and raw.get('user_id') is not None:
+        user_id = int(raw['user_id'])
+    return {"event_id": event_id, "bin_code": bin_code, "item": item, "quantity": quantity,
+            "created_at": _parse_timestamp(raw.get('timestamp')), "user_id": user_id}
+
+
+def ingest_bin_events(raw_events, user_id, allow_user=False, reason='smart_bin'):
+    """
+    Insert a batch of smart-bin events in one transaction.
+    Events whose event_id was already ingested (earlier or in this batch) are
+    skipped, so bins can retry a whole batch safely. Points go to `user_id`
+    unless `allow_user` lets each event name its own user.
+    Returns {"accepted", "duplicates", "rejected": [{"index", "error"}]}.
+    """
+    codes = [str(e.get('bin_code') or '').strip() for e in raw_events if isinstance(e, dict)]
+    bins = resolve_bins(codes)
+    events, rejected = [], []
+    for index, raw in enumerate(raw_events):
+        try:
+            events.append(_parse_event(raw, bins, user_id, allow_user))
+        except (EventError, ValueError, TypeError) as e:
+            rejected.append({"index": index, "error": str(e)})
+
+    for attempt in range(2):
+        try:
+            accepted, duplicates = _insert_batch(events, reason)
+            db.session.commit()
+            break
+        except IntegrityError:
+            # A concurrent retry of the same batch won the race; the second
+            # pass sees its event_ids and skips them.
+            db.session.rollback()
+            if attempt:
+                raise
+    return {"accepted": accepted, "duplicates": duplicates, "rejected": rejected}
+
+
+def _insert_batch(events, reason):
+    ids = list({e["event_id"] for e in events})
+    seen = set()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        seen.update(r[0] for r in db.session.query(models.BinEvent.event_id)
+                    .filter(models.BinEvent.event_id.in_(chunk)))
+    fresh = []
+    for e in events:
+        if e["event_id"] not in seen:
+            seen.add(e["event_id"])
+            fresh.append(e)
+
+    db.session.add_all(models.BinEvent(event_id=e["event_id"], bin_code=e["bin_code"]) for e in fresh)
+    record_plastic_batch([dict(e, reason=reason) for e in fresh])
+    return len(fresh), len(events) - len(fresh)
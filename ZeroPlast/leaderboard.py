@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+from math import ceil
+from flask import current_app
+from sqlalchemy import func, select, and_, distinct
+import models
+from app_setup import db
+from cache import TTLCache
+from signals import points_changed
+
+# Rendered leaderboard pages, keyed by (kind, challenge_id, page, per_page)
+_challenge_cache = TTLCache(maxsize=512)
+
+
+def invalidate_challenge_leaderboards():
+    """Drop cached challenge leaderboards (participants or teams changed)."""
+    _challenge_cache.clear()
+
+
+@points_changed.connect
+def _on_points_changed(sender, user_id=None, delta=0, **kwargs):
+    invalidate_challenge_leaderboards()
+    if _board is not None and user_id is not None:
+        try:
+            _board.incr(user_id, delta)
+        except Exception:
+            # The points are committed; a periodic or manual rebuild catches up
+            logging.getLogger(__name__).exception("leaderboard update failed")
+
+
+def _paginate(total, page, per_page, items):
+    return {
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": max(1, ceil(total / per_page)),
+    }
+
+
+def _challenge_user_points(challenge):
+    """
+    Subquery of (user_id, points) for every participant of `challenge`,
+    counting only PointsLog rows inside the challenge window.
+    """
+    participants = select(distinct(models.ChallengeParticipation.user_id).label('user_id')) \
+        .where(models.ChallengeParticipation.challenge_id == challenge.id) \
+        .subquery()
+    window = [models.PointsLog.user_id == participants.c.user_id]
+    if challenge.start_date:
+        window.append(models.PointsLog.created_at >= challenge.start_date)
+    if challenge.end_date:
+        # end_date is stored as a date at midnight; include that whole day
+        window.append(models.PointsLog.created_at < challenge.end_date + timedelta(days=1))
+    return select(participants.c.user_id,
+                  func.coalesce(func.sum(models.PointsLog.delta), 0).label('points')) \
+        .select_from(participants) \
+        .outerjoin(models.PointsLog, and_(*window)) \
+        .group_by(participants.c.user_id) \
+        .subquery()
+
+
+def challenge_user_leaderboard(challenge, page=1, per_page=None):
+    """One page of the participant leaderboard for a challenge (two queries)."""
+    per_page = per_page or current_app.config['LEADERBOARD_PAGE_SIZE']
+    key = ('users', challenge.id, page, per_page)
+
+    def compute():
+        points = _challenge_user_points(challenge)
+        total = db.session.execute(select(func.count()).select_from(points)).scalar()
+        rows = db.session.execute(
+            select(models.User.id, models.User.username, points.c.points)
+            .join(points, points.c.user_id == models.User.id)
+            .order_by(points.c.points.desc(), models.User.username)
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
+        items = [{"user_id": r.id, "username": r.username, "points": int(r.points)} for r in rows]
+        return _paginate(total, page, per_page, items)
+
+    return _challenge_cache.get_or_compute(key, compute, current_app.config['LEADERBOARD_CACHE_TTL'])
+
+
+def challenge_team_leaderboard(challenge, page=1, per_page=None):
+    """One page of the team leaderboard for a challenge (two queries)."""
+    per_page = per_page or current_app.config['LEADERBOARD_PAGE_SIZE']
+    key = ('teams', challenge.id, page, per_page)
+
+    def compute():
+        points = _challenge_user_points(challenge)
+        team_points = select(models.TeamMembership.team_id,
+                             func.sum(points.c.points).label('points')) \
+            .join(points, points.c.user_id == models.TeamMembership.user_id) \
+            .group_by(models.TeamMembership.team_id) \
+            .subquery()
+        total = db.session.execute(select(func.count()).select_from(team_points)).scalar()
+        rows = db.session.execute(
+            select(models.Team.id, models.Team.name, team_points.c.points)
+            .join(team_points, team_points.c.team_id == models.Team.id)
+            .order_by(team_points.c.points.desc(), models.Team.name)
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
+        items = [{"team_id": r.id, "name": r.name, "points": int(r.points)} for r in rows]
+        return _paginate(total, page, per_page, items)
+
+    return _challenge_cache.get_or_compute(key, compute, current_app.config['LEADERBOARD_CACHE_TTL'])
+
+
+# -----------------------------
+# Global leaderboard
+# -----------------------------
+class MemoryLeaderboard:
+    """
+    In-process ordered leaderboard. Entries are kept sorted by
+    (-points, user_id), so rank lookups are a binary search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._points = {}
+        self._order = []
+        self.built_at = None
+
+    def _remove(self, user_id):
+        old = self._points.pop(user_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+
+    def incr(self, user_id, delta):
+        with self._lock:
+            points = self._points.get(user_id, 0) + delta
+            self._remove(user_id)
+            self._points[user_id] = points
+            insort(self._order, (-points, user_id))
+
+    def rebuild(self, pairs):
+        with self._lock:
+            self._points = {user_id: int(points) for user_id, points in pairs}
+            self._order = sorted((-p, u) for u, p in self._points.items())
+            self.built_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+    def top(self, n):
+        with self._lock:
+            return [(u, -p) for p, u in self._order[:n]]
+
+    def rank(self, user_id):
+        """1-based rank, or None if the user has no points entry."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            return bisect_left(self._order, (-points, user_id)) + 1
+
+    def around(self, user_id, radius=2):
+        """[(rank, user_id, points)] for the user and `radius` neighbours each side."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return []
+            start = max(bisect_left(self._order, (-points, user_id)) - radius, 0)
+            window = self._order[start:start + 2 * radius + 1]
+            return [(start + i + 1, u, -p) for i, (p, u) in enumerate(window)]
+
+
+class RedisLeaderboard:
+    """Same interface backed by a Redis sorted set, shared by every worker."""
+
+    def __init__(self, url, key='zeroplast:leaderboard'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._key = key
+
+    def incr(self, user_id, delta):
+        self._redis.zincrby(self._key, delta, user_id)
+
+    def rebuild(self, pairs):
+        pipe = self._redis.pipeline()
+        pipe.delete(self._key)
+        mapping = {user_id: int(points) for user_id, points in pairs}
+        if mapping:
+            pipe.zadd(self._key, mapping)
+        pipe.execute()
+
+    def is_stale(self, max_age):
+        # Updates are shared, so the set only needs building once
+        return not self._redis.exists(self._key)
+
+    def top(self, n):
+        return [(int(u), int(p)) for u, p in self._redis.zrevrange(self._key, 0, n - 1, withscores=True)]
+
+    def rank(self, user_id):
+        rank = self._redis.zrevrank(self._key, user_id)
+        return None if rank is None else rank + 1
+
+    def around(self, user_id, radius=2):
+        rank = self._redis.zrevrank(self._key, user_id)
+        if rank is None:
+            return []
+        start = max(rank - radius, 0)
+        rows = self._redis.zrevrange(self._key, start, rank + radius, withscores=True)
+        return [(start + i + 1, int(u), int(p)) for i, (u, p) in enumerate(rows)]
+
+
+_board = None
+
+
+def global_leaderboard():
+    """
+    The app-wide leaderboard, built on first use and updated incrementally
+    on every points change. In-memory boards only see their own process's
+    writes, so they are also rebuilt from PointsBalance every
+    LEADERBOARD_REBUILD_INTERVAL seconds; set LEADERBOARD_REDIS_URL to share one.
+    """
+    board = _get_board()
+    if board.is_stale(current_app.config['LEADERBOARD_REBUILD_INTERVAL']):
+        rebuild_leaderboard()
+    return board
+
+
+def _get_board():
+    global _board
+    if _board is None:
+        url = current_app.config.get('LEADERBOARD_REDIS_URL')
+        _board = RedisLeaderboard(url) if url else MemoryLeaderboard()
+    return _board
+
+
+def rebuild_leaderboard(from_ledger=False):
+    """Reload the global leaderboard from PointsBalance, or from the full PointsLog ledger."""
+    if from_ledger:
+        from archive import points_ledger
+        ledger = points_ledger()
+        pairs = db.session.query(ledger.c.user_id, ledger.c.points).all()
+    else:
+        pairs = db.session.query(models.PointsBalance.user_id, models.PointsBalance.balance).all()
+    _get_board().rebuild(pairs)
+    return len(pairs)
+
+
+def _with_usernames(rows, user_index):
+    """Attach usernames to leaderboard rows with a single query."""
+    ids = [row[user_index] for row in rows]
+    names = dict(db.session.query(models.User.id, models.User.username).filter(models.User.id.in_(ids)).all()) if ids else {}
+    return [(*row, names.get(row[user_index])) for row in rows]
+
+
+def top_users(n=10):
+    """[{"rank", "user_id", "username", "points"}] for the top `n` users."""
+    rows = _with_usernames(global_leaderboard().top(n), 0)
+    return [{"rank": i + 1, "user_id": u, "username": name, "points": p} for i, (u, p, name) in enumerate(rows)]
+
+
+def users_around(user_id, radius=2):
+    """The user's own row plus `radius` neighbours above and below."""
+    rows = _with_usernames(global_leaderboard().around(user_id, radius), 1)
+    return [{"rank": r, "user_id": u, "username": name, "points": p} for r, u, p, name in rows]
+
+
+def user_rank(user_id):
+    return global_leaderboard().rank(user_id)
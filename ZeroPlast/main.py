@@ -13,6 +13,9 @@ from routes.dashboard import dashboard_bp
 from routes.admin import admin_bp
 from routes.challenge import challenge_bp
 from routes.teams import teams_bp
+from routes.analytics import analytics_bp
+from commands import register_commands
+from identity import load_identity
 
 
 
@@ -28,7 +31,7 @@ login_manager.login_view = "auth.login"  # Redirect here if @login_required fail
 
 @login_manager.user_loader
 def load_user(user_id):
-    return models.User.query.get(int(user_id))
+    return load_identity(int(user_id))
 
 
 # PUBLIC LANDING PAGE
@@ -37,10 +40,8 @@ def home():
     if current_user.is_authenticated:
         if current_user.role == 'admin':
             return redirect(url_for("admin.admin"))
-        elif current_user.role == 'vendor':
-            vendor = models.Vendor.query.filter_by(name=current_user.username).first()
-            if vendor:
-                return redirect(url_for("admin.vendor_detail", vendor_id=vendor.id))
+        elif current_user.role == 'vendor' and current_user.vendor_id:
+            return redirect(url_for("admin.vendor_detail", user_id=current_user.id))
         # default user
         return redirect(url_for("dashboard.dashboard")) 
     return render_template('index.html',
@@ -62,6 +63,9 @@ app.register_blueprint(challenge_bp)
 
 app.register_blueprint(teams_bp)
 app.register_blueprint(dashboard_bp)
+app.register_blueprint(analytics_bp)
+
+register_commands(app)
 
 if __name__ == "__main__":
     app.run()
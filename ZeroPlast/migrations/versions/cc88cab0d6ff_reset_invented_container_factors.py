@@ -0,0 +1,33 @@
+"""reset invented container factors
+
+Revision ID: cc88cab0d6ff
+Revises: 2a7c249557eb
+Create Date: 2026-10-18 12:52:40.080582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc88cab0d6ff'
+down_revision = '2a7c249557eb'
+branch_labels = None
+depends_on = None
+
+
+item_type = sa.table('item_type', sa.column('key', sa.String), sa.column('default_weight_kg', sa.Float),
+                     sa.column('co2_kg', sa.Float), sa.column('landfill_l', sa.Float))
+
+
+def upgrade():
+    # d3dd82090066 used to seed 'container' with factors that were never in the app; put back what the
+    # smart-bin seed gives it (the column defaults), unless an admin has changed them since
+    op.execute(item_type.update()
+               .where(item_type.c.key == 'container', item_type.c.default_weight_kg == 0.025,
+                      item_type.c.co2_kg == 0.07, item_type.c.landfill_l == 0.06)
+               .values(default_weight_kg=0.02, co2_kg=0, landfill_l=0))
+
+
+def downgrade():
+    pass
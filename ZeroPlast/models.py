@@ -7,27 +7,69 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(150), unique=True)
     password = db.Column(db.String(150))
     email = db.Column(db.String(150), unique=True)
-    role = db.Column(db.String(20), default='user')
+    role = db.Column(db.String(20), default='user', index=True)
 
     logs = db.relationship('PlasticLog', backref='user')
 
 class PlasticLog(db.Model):
+    __table_args__ = (
+        # per-user history: dashboard, nudges, keyset-paginated logs API
+        db.Index('ix_plastic_log_user_created', 'user_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     item = db.Column(db.String(150))
     quantity = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
 class PointsLog(db.Model):
+    __table_args__ = (
+        # ledger sums per user and challenge-window joins
+        db.Index('ix_points_log_user_created', 'user_id', 'created_at', 'delta'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     delta = db.Column(db.Integer, nullable=False)
     reason = db.Column(db.String(200), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Materialized running total of PointsLog.delta per user (see utils.add_points)
+class PointsBalance(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    balance = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Per-day rollups maintained alongside every log insert (see rollups.py)
+class DailyItemRollup(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    item = db.Column(db.String(150), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    logs = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyPointsRollup(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+# Per-user rollups behind the dashboard summary (one row per item / per active day)
+class UserItemRollup(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    item = db.Column(db.String(150), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    logs = db.Column(db.Integer, nullable=False, default=0)
+
+class UserDailyRollup(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_daily_rollup_user_quantity', 'user_id', 'quantity'),  # top days
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    logs = db.Column(db.Integer, nullable=False, default=0)
 
 class Vendor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
     discount = db.Column(db.Integer, default=0)
     description = db.Column(db.String(300), default='')
 
@@ -36,10 +78,11 @@ class Reward(db.Model):
     name = db.Column(db.String(120), nullable=False)
     cost_points = db.Column(db.Integer, nullable=False)
     description = db.Column(db.String(300), default='')
+    stock = db.Column(db.Integer)  # units left; NULL = unlimited
 
 class Redemption(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     reward_id = db.Column(db.Integer, db.ForeignKey('reward.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -53,10 +96,16 @@ class Team(db.Model):
 
 class TeamMembership(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Member count and summed member points per team (see rollups.py)
+class TeamStats(db.Model):
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), primary_key=True)
+    member_count = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
 class Challenge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
@@ -66,6 +115,9 @@ class Challenge(db.Model):
     points_bonus = db.Column(db.Integer, default=10)
 
 class ChallengeParticipation(db.Model):
+    __table_args__ = (
+        db.Index('ix_challenge_participation_challenge_user', 'challenge_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -82,6 +134,9 @@ class ItemType(db.Model):
     key = db.Column(db.String(80), unique=True, nullable=False)  # e.g. 'bottle_500ml', 'bag'
     display_name = db.Column(db.String(120), nullable=False)
     default_weight_kg = db.Column(db.Float, default=0.02)        # fallback if log has no weight
+    # Impact factors per item, read by impact.ImpactEngine (plastic uses default_weight_kg)
+    co2_kg = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    landfill_l = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
 
 # Optional: store actual weight if known (e.g., IoT bin read)
 
@@ -91,6 +146,13 @@ class SmartBin(db.Model):
     location = db.Column(db.String(120), default='')
     item_type_id = db.Column(db.Integer, db.ForeignKey('item_type.id'), nullable=True)
 
+# Smart-bin events already ingested, so retried batches are not logged twice
+class BinEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(100), unique=True, nullable=False)
+    bin_code = db.Column(db.String(50), nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # Alternatives & Vendor integration
 class AlternativeItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -107,3 +169,58 @@ class PolicyRecommendation(db.Model):
     text = db.Column(db.String(300), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     active = db.Column(db.Boolean, default=True)
+
+# Jobs for the sqlite task broker (see tasks.py)
+class TaskJob(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_job_status_id', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    args = db.Column(db.Text, nullable=False, default='[]')  # JSON list
+    key = db.Column(db.String(200), nullable=True, index=True)  # dedupe key while queued
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued / running / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# When the replica's data was copied from the primary (see replica.py)
+class ReplicaHeartbeat(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+
+# Log rows older than the archive horizon live in gzipped NDJSON files; these
+# tables keep what the app still needs from them (see archive.py)
+class LogArchive(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'plastic' | 'points'
+    month = db.Column(db.Date, nullable=False)
+    first_id = db.Column(db.Integer, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False)
+    rows = db.Column(db.Integer, nullable=False)
+    path = db.Column(db.String(300), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MonthlyUserItem(db.Model):
+    __table_args__ = (
+        db.Index('ix_monthly_user_item_month_user_item', 'month', 'user_id', 'item'),  # folding a batch in
+        db.Index('ix_monthly_user_item_user_month', 'user_id', 'month'),  # per-user series
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    item = db.Column(db.String(150))
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    logs = db.Column(db.Integer, nullable=False, default=0)
+
+class MonthlyUserPoints(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)  # sum of archived PointsLog deltas in the month
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+class PointsCheckpoint(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)  # sum of archived PointsLog deltas
+    entries = db.Column(db.Integer, nullable=False, default=0)
+    through = db.Column(db.DateTime, nullable=False)  # archived up to (exclusive)
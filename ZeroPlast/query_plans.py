@@ -0,0 +1,95 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, select, text, tuple_
+import analytics
+import archive
+import exports
+import models
+from app_setup import db
+from leaderboard import _challenge_user_points
+
+_NOW = datetime(2025, 1, 1)
+
+
+def hot_queries():
+    """(name, statement) for the queries the routes run on every page view."""
+    challenge = models.Challenge(id=1, start_date=_NOW, end_date=_NOW)
+    points = _challenge_user_points(challenge)
+    ledger = archive.points_ledger([1])
+    PL = models.PlasticLog
+    UD, UI = models.UserDailyRollup, models.UserItemRollup
+    month_ago = _NOW - timedelta(days=30)
+
+    def series(name, metric, granularity, **filters):
+        query, _ = analytics._series_query(metric, granularity, month_ago, _NOW, **filters)
+        return (f"analytics {name}", query.statement)
+
+    def archived(name, metric, **filters):
+        query = analytics._archived_months(metric, month_ago, _NOW, None, filters.get('user_id'), filters.get('team_id'))
+        return (f"analytics archived {name}", query.statement)
+
+    return [
+        # dashboard (utils.user_summary)
+        ("dashboard recent logs", select(PL).where(PL.user_id == 1)
+            .order_by(PL.created_at.desc(), PL.id.desc()).limit(10)),
+        ("dashboard week", select(UD.day, UD.quantity).where(UD.user_id == 1, UD.day >= month_ago.date())),
+        ("dashboard top days", select(UD.day, UD.quantity).where(UD.user_id == 1)
+            .order_by(UD.quantity.desc(), UD.day.desc()).limit(3)),
+        ("user items (dashboard, nudges)", select(UI.item, UI.quantity).where(UI.user_id == 1)),
+        ("points balance", select(models.PointsBalance).where(models.PointsBalance.user_id == 1)),
+        ("ledger points (archive.points_ledger)", select(ledger.c.points)),
+        # logs API
+        ("logs api keyset page", select(PL).where(PL.user_id == 1, PL.created_at > _NOW,
+                                                  tuple_(PL.created_at, PL.id) < (_NOW, 5))
+            .order_by(PL.created_at.desc(), PL.id.desc()).limit(51)),
+        ("logs api fingerprint", select(func.max(PL.id), func.count(PL.id)).where(PL.user_id == 1)),
+        ("export date range", exports.export_query('plastic', start=_NOW, end=_NOW)),
+        ("export user date range", exports.export_query('points', start=_NOW, user_id=1)),
+        # /api/analytics/timeseries
+        series("rollup buckets", 'items', 'day', item='bottle'),
+        series("rollup points buckets", 'points', 'week'),
+        series("user buckets", 'items', 'day', user_id=1),
+        series("user points buckets", 'points', 'month', user_id=1),
+        series("team buckets", 'logs', 'week', team_id=1),
+        archived("user months", 'items', user_id=1),
+        archived("user points months", 'points', user_id=1),
+        archived("team points months", 'points', team_id=1),
+        # challenges, teams, identity
+        ("challenge joined", select(models.ChallengeParticipation)
+            .where(models.ChallengeParticipation.challenge_id == 1,
+                   models.ChallengeParticipation.user_id == 1)),
+        ("challenge user points", select(points)),
+        ("team membership", select(models.TeamMembership).where(models.TeamMembership.user_id == 1)),
+        ("team members", select(models.TeamMembership.user_id).where(models.TeamMembership.team_id == 1)),
+        ("vendor by name", select(models.Vendor).where(models.Vendor.name == 'v')),
+        ("users by role", select(models.User).where(models.User.role == 'vendor')),
+    ]
+
+
+def full_scans(plan_rows, tables):
+    """Plan lines that walk a whole real table (SCAN <table>, with or without an index)."""
+    bad = []
+    for row in plan_rows:
+        detail = row[-1]
+        m = re.match(r'SCAN (\w+)', detail)
+        if m and m.group(1) in tables:
+            bad.append(detail)
+    return bad
+
+
+def check_query_plans():
+    """
+    EXPLAIN QUERY PLAN every hot query against a fresh SQLite schema.
+    Returns [(name, plan_lines, full_scan_lines)].
+    """
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    tables = set(db.metadata.tables)
+    results = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries():
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+            results.append((name, [r[-1] for r in rows], full_scans(rows, tables)))
+    engine.dispose()
+    return results
@@ -0,0 +1,180 @@
+"""
+Read replica routing.
+
+With REPLICA_DATABASE_URL set, views decorated with @replica_reads() run
+their SELECTs on the 'replica' bind instead of the primary, so heavy
+analytics don't compete with the write path. REPLICA_DATABASE_URL can be:
+
+    readonly     the primary SQLite file, opened read-only (no lag)
+    <any URL>    a separate copy, e.g. a second SQLite file kept fresh by
+                 `flask --app main sync-replica --every 5`
+
+A separate copy's lag is read from its replica_heartbeat row (stamped on the
+primary right before each sync). A view only uses the replica while the lag
+is within its tolerance (the decorator's max_lag, REPLICA_MAX_LAG, or the
+endpoint's entry in REPLICA_ROUTE_MAX_LAG) and the current user hasn't
+written anything the replica hasn't caught up with yet; otherwise, and for
+any statement that writes, the primary is used. Views without the decorator,
+like the dashboard, always read their own writes from the primary, and so
+does every recompute of a shared cached aggregate (cache.cached_aggregate).
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+log = logging.getLogger(__name__)
+
+BIND = 'replica'
+_LAG_CHECK_INTERVAL = 2  # seconds between heartbeat reads
+
+
+class RoutingSession(Session):
+    """db.session class: sends reads to the replica bind while g.use_replica is set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('use_replica'):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True  # read the rest of this session's data back from the primary
+            elif not self.info.get('wrote'):
+                return self._db.engines[BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def configure_replica(app):
+    """Register the 'replica' bind from REPLICA_DATABASE_URL (call before db.init_app)."""
+    url = app.config['REPLICA_DATABASE_URL']
+    if not url:
+        return
+    if url == 'readonly':
+        primary = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if primary.get_backend_name() != 'sqlite' or primary.database in (None, '', ':memory:'):
+            raise ValueError("REPLICA_DATABASE_URL=readonly needs a file-backed SQLite primary")
+        url = primary.set(database=f"file:{primary.database}", query={"mode": "ro", "uri": "true"})
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[BIND] = url
+
+
+def enabled():
+    return bool(current_app.config['REPLICA_DATABASE_URL'])
+
+
+# -----------------------------
+# Lag
+# -----------------------------
+_lag_lock = threading.Lock()
+_lag_state = {"checked": 0.0, "synced_at": None}
+
+
+def replica_synced_at():
+    """Primary time the replica's data is as fresh as (None when unknown or unreachable)."""
+    if current_app.config['REPLICA_DATABASE_URL'] == 'readonly':
+        return datetime.utcnow()
+    with _lag_lock:
+        if time.monotonic() - _lag_state["checked"] < _LAG_CHECK_INTERVAL:
+            return _lag_state["synced_at"]
+    from app_setup import db
+    import models
+    heartbeat = models.ReplicaHeartbeat.__table__
+    try:
+        with db.engines[BIND].connect() as conn:
+            synced_at = conn.execute(heartbeat.select().with_only_columns(heartbeat.c.beat_at)
+                                     .where(heartbeat.c.id == 1)).scalar()
+    except Exception as e:
+        log.warning("Replica unavailable, reading from the primary: %s", e)
+        synced_at = None
+    with _lag_lock:
+        _lag_state.update(checked=time.monotonic(), synced_at=synced_at)
+    return synced_at
+
+
+def reads_fresh_until():
+    """Primary time the current reads reflect: the replica's sync time while on the replica, else now."""
+    now = datetime.utcnow()
+    if has_app_context() and g.get('use_replica'):
+        return min(replica_synced_at() or now, now)
+    return now
+
+
+# -----------------------------
+# Read-your-writes
+# -----------------------------
+def note_write(user_id):
+    """Remember that `user_id` just wrote, so their replica reads wait until the replica has it."""
+    from app_setup import shared_cache
+    if user_id is not None and enabled():
+        shared_cache.set(f"last-write:{user_id}", datetime.utcnow(), timeout=3600)
+
+
+def _user_is_caught_up(synced_at):
+    if not current_user or not current_user.is_authenticated:
+        return True
+    from app_setup import shared_cache
+    last_write = shared_cache.get(f"last-write:{current_user.id}")
+    return last_write is None or last_write <= synced_at
+
+
+# -----------------------------
+# Views
+# -----------------------------
+def replica_reads(max_lag=None):
+    """
+    Serve the decorated view's GET requests from the replica when it is at
+    most `max_lag` seconds behind (default REPLICA_MAX_LAG; an endpoint entry
+    in REPLICA_ROUTE_MAX_LAG overrides both).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            g.use_replica = request.method in ('GET', 'HEAD') and enabled() and _replica_fresh_enough(max_lag)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def _replica_fresh_enough(max_lag):
+    config = current_app.config
+    tolerance = config['REPLICA_ROUTE_MAX_LAG'].get(request.endpoint,
+                                                    config['REPLICA_MAX_LAG'] if max_lag is None else max_lag)
+    synced_at = replica_synced_at()
+    if synced_at is None:
+        return False
+    lag = (datetime.utcnow() - synced_at).total_seconds()
+    return lag <= tolerance and _user_is_caught_up(synced_at)
+
+
+# -----------------------------
+# SQLite replica maintenance
+# -----------------------------
+def sync_sqlite_replica():
+    """
+    Stamp the heartbeat on the primary, then copy the primary SQLite file
+    over the replica file with the online backup API. Returns the stamp.
+    """
+    import sqlite3
+    from app_setup import db
+    import models
+    if current_app.config['REPLICA_DATABASE_URL'] == 'readonly':
+        raise ValueError("a readonly replica is the primary file itself; there is nothing to sync")
+    primary, replica = db.engine.url, db.engines[BIND].url
+    if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite':
+        raise ValueError("sync-replica copies SQLite files; use the database's own replication otherwise")
+    stamped = datetime.utcnow()
+    heartbeat = models.ReplicaHeartbeat.__table__
+    with db.engine.begin() as conn:
+        if conn.execute(heartbeat.update().where(heartbeat.c.id == 1).values(beat_at=stamped)).rowcount == 0:
+            conn.execute(heartbeat.insert().values(id=1, beat_at=stamped))
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database, timeout=current_app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    with _lag_lock:
+        _lag_state["checked"] = 0.0
+    return stamped
@@ -0,0 +1,192 @@
+from datetime import date
+from sqlalchemy import func, literal, select, union_all, update
+import models
+import archive
+from app_setup import db
+
+
+# -----------------------------
+# Incremental maintenance
+# -----------------------------
+def record_item(day, item, quantity, logs=1):
+    """Add PlasticLog quantities to their (day, item) rollup. Caller commits."""
+    row = db.session.get(models.DailyItemRollup, (day, item))
+    if row is None:
+        row = models.DailyItemRollup(day=day, item=item, quantity=0, logs=0)
+        db.session.add(row)
+        db.session.flush()
+    row.quantity = models.DailyItemRollup.quantity + quantity
+    row.logs = models.DailyItemRollup.logs + logs
+    db.session.flush()
+
+
+def record_points(day, delta, entries=1):
+    """Add PointsLog deltas to their day's rollup. Caller commits."""
+    row = db.session.get(models.DailyPointsRollup, day)
+    if row is None:
+        row = models.DailyPointsRollup(day=day, points=0, entries=0)
+        db.session.add(row)
+        db.session.flush()
+    row.points = models.DailyPointsRollup.points + delta
+    row.entries = models.DailyPointsRollup.entries + entries
+    db.session.flush()
+
+
+def record_user_item(user_id, day, item, quantity, logs=1):
+    """Add a user's PlasticLog quantities to their per-item and per-day rollups. Caller commits."""
+    row = db.session.get(models.UserItemRollup, (user_id, item))
+    if row is None:
+        row = models.UserItemRollup(user_id=user_id, item=item, quantity=0, logs=0)
+        db.session.add(row)
+        db.session.flush()
+    row.quantity = models.UserItemRollup.quantity + quantity
+    row.logs = models.UserItemRollup.logs + logs
+    row = db.session.get(models.UserDailyRollup, (user_id, day))
+    if row is None:
+        row = models.UserDailyRollup(user_id=user_id, day=day, quantity=0, logs=0)
+        db.session.add(row)
+        db.session.flush()
+    row.quantity = models.UserDailyRollup.quantity + quantity
+    row.logs = models.UserDailyRollup.logs + logs
+    db.session.flush()
+
+
+def _team_row(team_id):
+    row = db.session.get(models.TeamStats, team_id)
+    if row is None:
+        row = models.TeamStats(team_id=team_id, member_count=0, points=0)
+        db.session.add(row)
+        db.session.flush()
+    return row
+
+
+def record_team_join(team_id, member_points):
+    """A member with `member_points` joined the team. Caller commits."""
+    row = _team_row(team_id)
+    row.member_count = models.TeamStats.member_count + 1
+    row.points = models.TeamStats.points + member_points
+    db.session.flush()
+
+
+def record_team_leave(team_id, member_points):
+    """A member with `member_points` left the team. Caller commits."""
+    row = _team_row(team_id)
+    row.member_count = models.TeamStats.member_count - 1
+    row.points = models.TeamStats.points - member_points
+    db.session.flush()
+
+
+def record_member_points(user_id, delta):
+    """Add a user's points delta to every team they belong to, in one UPDATE. Caller commits."""
+    teams = select(models.TeamMembership.team_id).where(models.TeamMembership.user_id == user_id)
+    db.session.execute(update(models.TeamStats)
+                       .where(models.TeamStats.team_id.in_(teams))
+                       .values(points=models.TeamStats.points + delta)
+                       .execution_options(synchronize_session=False))
+
+
+def rebuild_team_stats():
+    """Recompute TeamStats from memberships and the points ledger. Returns team count."""
+    ledger = archive.points_ledger()
+    rows = db.session.query(models.Team.id,
+                            func.count(models.TeamMembership.id),
+                            func.coalesce(func.sum(ledger.c.points), 0)) \
+        .outerjoin(models.TeamMembership, models.TeamMembership.team_id == models.Team.id) \
+        .outerjoin(ledger, ledger.c.user_id == models.TeamMembership.user_id) \
+        .group_by(models.Team.id).all()
+    models.TeamStats.query.delete()
+    db.session.add_all(models.TeamStats(team_id=t, member_count=n, points=int(p)) for t, n, p in rows)
+    db.session.commit()
+    return len(rows)
+
+
+def team_leaderboard(n=10):
+    """[{"team_id", "name", "members", "points"}] for the top `n` teams, one query."""
+    rows = db.session.query(models.Team.id, models.Team.name,
+                            models.TeamStats.member_count, models.TeamStats.points) \
+        .join(models.TeamStats, models.TeamStats.team_id == models.Team.id) \
+        .order_by(models.TeamStats.points.desc(), models.Team.name).limit(n).all()
+    return [{"team_id": t, "name": name, "members": m, "points": p} for t, name, m, p in rows]
+
+
+def newest_members(n):
+    """SELECT (team_id, username) of each team's `n` newest members, read through the team_id index."""
+    M = models.TeamMembership
+    newest = select(M.id).where(M.team_id == models.Team.id).order_by(M.id.desc()).limit(n).correlate(models.Team)
+    return select(M.team_id, models.User.username).select_from(models.Team) \
+        .join(M, M.id.in_(newest)) \
+        .join(models.User, models.User.id == M.user_id) \
+        .order_by(models.User.username)
+
+
+def backfill():
+    """
+    Rebuild the daily and per-user rollup tables from PlasticLog / PointsLog
+    (plus MonthlyUserItem for archived rows). Days that have been archived
+    are no longer in the log tables, so their daily rows are kept. Returns row counts.
+    """
+    since = archive.archived_through()
+    log, points_log = models.PlasticLog, models.PointsLog
+    for model in (models.DailyItemRollup, models.DailyPointsRollup, models.UserDailyRollup):
+        model.query.filter(*([model.day >= since.date()] if since else [])).delete(synchronize_session=False)
+    models.UserItemRollup.query.delete()
+    hot = [log.created_at >= since] if since else []
+    hot_points = [points_log.created_at >= since] if since else []
+
+    day = func.date(log.created_at)
+    items = db.session.query(day, log.item, func.sum(log.quantity), func.count(log.id)) \
+        .filter(*hot).group_by(day, log.item).all()
+    db.session.add_all(models.DailyItemRollup(day=_as_date(d), item=item, quantity=int(q or 0), logs=n)
+                       for d, item, q, n in items)
+    day = func.date(points_log.created_at)
+    points = db.session.query(day, func.sum(points_log.delta), func.count(points_log.id)) \
+        .filter(*hot_points).group_by(day).all()
+    db.session.add_all(models.DailyPointsRollup(day=_as_date(d), points=int(p or 0), entries=n)
+                       for d, p, n in points)
+    day = func.date(log.created_at)
+    db.session.add_all(models.UserDailyRollup(user_id=uid, day=_as_date(d), quantity=int(q or 0), logs=n)
+                       for uid, d, q, n in db.session.query(log.user_id, day, func.sum(log.quantity),
+                                                            func.count(log.id))
+                       .filter(log.user_id.isnot(None), *hot).group_by(log.user_id, day))
+    # Per-user item totals cover all history: hot rows plus the archived monthly aggregates
+    monthly = models.MonthlyUserItem
+    both = union_all(
+        select(log.user_id, log.item, log.quantity, literal(1).label('logs')).where(log.user_id.isnot(None)),
+        select(monthly.user_id, monthly.item, monthly.quantity, monthly.logs).where(monthly.user_id.isnot(None)),
+    ).subquery()
+    db.session.add_all(models.UserItemRollup(user_id=uid, item=item, quantity=int(q or 0), logs=int(n))
+                       for uid, item, q, n in db.session.query(both.c.user_id, both.c.item, func.sum(both.c.quantity),
+                                                               func.sum(both.c.logs))
+                       .group_by(both.c.user_id, both.c.item))
+    db.session.commit()
+    return len(items), len(points)
+
+
+def _as_date(value):
+    # SQLite's date() returns text, other backends return a date
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+# -----------------------------
+# Readers
+# -----------------------------
+def totals() -> dict:
+    """Community-wide items, logs and points, read from the rollups."""
+    items, logs = db.session.query(func.sum(models.DailyItemRollup.quantity),
+                                   func.sum(models.DailyItemRollup.logs)).one()
+    points = db.session.query(func.sum(models.DailyPointsRollup.points)).scalar()
+    return {"items": int(items or 0), "logs": int(logs or 0), "points": int(points or 0)}
+
+
+def by_item() -> dict:
+    rows = db.session.query(models.DailyItemRollup.item, func.sum(models.DailyItemRollup.quantity)) \
+        .group_by(models.DailyItemRollup.item).all()
+    return {item: int(q) for item, q in rows}
+
+
+def daily_items():
+    """(dates, values) of total items logged per day, oldest first."""
+    rows = db.session.query(models.DailyItemRollup.day, func.sum(models.DailyItemRollup.quantity)) \
+        .group_by(models.DailyItemRollup.day) \
+        .order_by(models.DailyItemRollup.day).all()
+    return [d.strftime('%Y-%m-%d') for d, _ in rows], [int(q) for _, q in rows]
@@ -1,8 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash,abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash,abort,Response,stream_with_context,jsonify
 from flask_login import login_required, current_user
 from collections import defaultdict
+from datetime import datetime
 import models
-from utils import estimate_impacts_from_counts,generate_trend_graph
+import rollups
+import exports
+import archive
+import impact
+import sql_metrics
+import tasks
+from replica import replica_reads
+from utils import estimate_impacts_from_counts,generate_trend_graph,calculate_points
 import base64
 from flask import send_file
 from io import BytesIO
@@ -10,27 +18,21 @@ from io import BytesIO
 admin_bp = Blueprint("admin", __name__)
 
 def aggregate_daily_logs():
-    daily = defaultdict(int)
-    for l in models.PlasticLog.query.all():
-        key = l.created_at.strftime('%Y-%m-%d')
-        daily[key] += l.quantity
-    dates = sorted(daily.keys())
-    values = [daily[d] for d in dates]
-    return dates, values
+    return rollups.daily_items()
 
 
 @admin_bp.route('/admin')
 @login_required
+@replica_reads()
 def admin():
-    logs = models.PlasticLog.query.all()
-    total_items = int(sum([l.quantity for l in logs]))
-    by_item = {}
-    for l in logs:
-        by_item[l.item] = by_item.get(l.item, 0) + l.quantity
+    # Everything below reads the daily rollups, not the raw log tables
+    summary = rollups.totals()
+    total_items = summary["items"]
+    by_item = rollups.by_item()
     totals = {
-        "logs": len(logs),
+        "logs": summary["logs"],
         "users": models.User.query.count(),
-        "points": sum(p.delta for p in models.PointsLog.query.all())
+        "points": summary["points"]
     }
     totals.update(estimate_impacts_from_counts(by_item))
     dates, values = aggregate_daily_logs()
@@ -49,7 +51,8 @@ def admin():
     vendors = models.User.query.filter_by(role="vendor").all()
     users = models.User.query.filter_by(role="user").all()
     return render_template('admin.html',
-       trend_labels=dates, trend_values=values, recommendations=recs, tot_it=total_items,
+       trend_labels=dates, trend_values=values, trend_svg=generate_trend_graph(dates, values),
+        recommendations=recs, tot_it=total_items,
         vendors=vendors, users=users, totals=totals)
 
 
@@ -57,6 +60,7 @@ def admin():
 # Vendors list page
 @admin_bp.route('/admin/vendors')
 @login_required
+@replica_reads()
 def vendors_page():
     vendors = models.User.query.filter_by(role="vendor").all()
     return render_template('vendors.html', vendors=vendors)
@@ -80,37 +84,63 @@ def vendor_detail(user_id):
 # Users list page
 @admin_bp.route('/admin/users')
 @login_required
+@replica_reads()
 def users_page():
-    logs = models.PlasticLog.query.all()
-    total_items = int(sum([l.quantity for l in logs]))
-    by_item = {}
-    for l in logs:
-        by_item[l.item] = by_item.get(l.item, 0) + l.quantity
-    totals = {
-        "logs": len(logs),
-        "users": models.User.query.count(),
-        "points": sum(p.delta for p in models.PointsLog.query.all())
-    }
-    totals.update(estimate_impacts_from_counts(by_item))
-    recs = [
-        'Ban single-use plastics at all campus events and canteens',
-        'Install mandatory water refill stations in every building',
-        'Vendor contracts must use reusable/compostable packaging',
-        'Offer BYO discounts at partner vendors',
-        'Run a “Plastic-Free Week” each semester',
-    ]
     users = models.User.query.filter_by(role="user").all()
-    return render_template('users.html', users=users)
+    impacts = impact.per_user([u.id for u in users])
+    return render_template('users.html', users=users, impacts=impacts)
 # User detail page
 @admin_bp.route('/admin/user/<int:user_id>')
 @login_required
 def user_detail(user_id):
     user = models.User.query.get_or_404(user_id)
     # Calculate total points for user
-    total_points = sum(p.delta for p in models.PointsLog.query.filter_by(user_id=user.id).all())
-    user.total_points = total_points
+    user.total_points = calculate_points(user.id)
     return render_template('user.html', user=user)
 
+# Impact report for every user (or every day) in one pass: /admin/api/impact/<users|days>
+@admin_bp.route('/admin/api/impact/<by>')
+@login_required
+@replica_reads()
+def impact_report(by):
+    if current_user.role != 'admin':
+        abort(403)
+    if by == 'users':
+        report = impact.per_user()
+    elif by == 'days':
+        report = {day.isoformat(): values for day, values in impact.per_day().items()}
+    else:
+        abort(404)
+    return jsonify({"ok": True, "impact": report})
+
+# Per-endpoint SQL counts and timings since startup (see sql_metrics.py)
+@admin_bp.route('/admin/metrics', methods=['GET', 'POST'])
+@login_required
+def metrics():
+    if current_user.role != 'admin':
+        abort(403)
+    if request.method == 'POST':
+        sql_metrics.reset()
+        return redirect(url_for('admin.metrics'))
+    stats = sql_metrics.endpoint_stats()
+    if request.args.get('format') == 'json':
+        return jsonify({"ok": True, "endpoints": stats})
+    return render_template('metrics.html', stats=stats)
+
+# Queue a maintenance job (runs on the task broker, see tasks.py)
+MAINTENANCE_TASKS = ('rebuild_rollups', 'rebuild_leaderboard', 'evict_charts')
+
+@admin_bp.route('/admin/tasks/<name>', methods=['POST'])
+@login_required
+def run_task(name):
+    if current_user.role != 'admin':
+        abort(403)
+    if name not in MAINTENANCE_TASKS:
+        abort(404)
+    tasks.enqueue(name, key=name)
+    flash(f"Queued {name.replace('_', ' ')}.", 'success')
+    return redirect(url_for('admin.admin'))
+
 # Host a challenge (admin only)
 @admin_bp.route('/admin/host-challenge', methods=['POST'])
 @login_required
@@ -123,7 +153,6 @@ def host_challenge():
     start_date = request.form.get('start_date')
     end_date = request.form.get('end_date')
     points_bonus = request.form.get('points_bonus', 10)
-    from datetime import datetime
     challenge = models.Challenge(
         name=name,
         description=description,
@@ -143,4 +172,34 @@ def host_challenge():
 @login_required
 def challenges_page():
     challenges = models.Challenge.query.order_by(models.Challenge.start_date.desc()).all()
-    return render_template('challenges.html', challenges=challenges)
\ No newline at end of file
+    return render_template('challenges.html', challenges=challenges)
+
+
+# Streaming export of log tables: /admin/export/<plastic|points|redemptions>.<csv|ndjson>
+# Filters: ?start=YYYY-MM-DD&end=YYYY-MM-DD&user_id=&item=  Add ?gzip=1 to compress.
+@admin_bp.route('/admin/export/<kind>.<fmt>')
+@login_required
+@replica_reads()
+def export(kind, fmt):
+    if current_user.role != 'admin':
+        abort(403)
+    if kind not in exports.EXPORTS or fmt not in ('csv', 'ndjson'):
+        abort(404)
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d') if start else None
+        end = datetime.strptime(end, '%Y-%m-%d') if end else None
+    except ValueError:
+        abort(400)
+    filters = dict(start=start, end=end, user_id=request.args.get('user_id', type=int), item=request.args.get('item'))
+    stmt = exports.export_query(kind, **filters)
+    # Rows moved out by archive-logs come first, read back from their archive files
+    archived = archive.archived_rows(kind, **filters, chunk_rows=exports.CHUNK_ROWS) if kind in archive.KINDS else ()
+    body = exports.stream_csv(kind, stmt, archived) if fmt == 'csv' else exports.stream_ndjson(kind, stmt, archived)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"{kind}_logs.{fmt}"
+    if request.args.get('gzip'):
+        body, mimetype, filename = exports.gzipped(body), 'application/gzip', filename + '.gz'
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request, abort
+from flask_login import login_required, current_user
+import analytics
+from replica import replica_reads
+
+analytics_bp = Blueprint("analytics", __name__)
+
+
+def _utc_arg(name):
+    """ISO datetime query arg as naive UTC (what the log tables store); offsets are converted."""
+    if not request.args.get(name):
+        return None
+    value = datetime.fromisoformat(request.args[name])
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+# ?granularity=hour|day|week|month&metric=items|logs|points&start=&end=(ISO)&item=&user_id=&team_id=
+# Without user_id / team_id the series covers everyone; other users' series are admin-only.
+@analytics_bp.route('/api/analytics/timeseries')
+@login_required
+@replica_reads()
+def timeseries():
+    user_id = request.args.get('user_id', type=int)
+    if user_id is not None and user_id != current_user.id and current_user.role != 'admin':
+        abort(403)
+    try:
+        start, end = _utc_arg('start'), _utc_arg('end')
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid start or end"}), 400
+    granularity = request.args.get('granularity', 'day')
+    metric = request.args.get('metric', 'items')
+    try:
+        series = analytics.timeseries(metric, granularity, start=start, end=end,
+                                      item=request.args.get('item') or None, user_id=user_id,
+                                      team_id=request.args.get('team_id', type=int))
+    except analytics.AnalyticsError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "granularity": granularity, "metric": metric, **series})
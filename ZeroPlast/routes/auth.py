@@ -1,7 +1,8 @@
 from flask import Blueprint, request, render_template, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 import models
-from db_setup import db
+from app_setup import db
+from identity import load_identity
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -28,8 +29,7 @@ def login():
                 if user.role == 'admin':
                     return redirect(url_for("admin.admin"))
                 elif user.role == 'vendor':
-                    vendor = models.Vendor.query.filter_by(name=user.username).first()
-                    if vendor:
+                    if load_identity(user.id).vendor_id:
                         return redirect(url_for("admin.vendor_detail", user_id=user.id))
                 # default user
                 flash("Logged in successfully!", "success")
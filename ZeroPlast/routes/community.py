@@ -1,33 +1,55 @@
-from flask import Blueprint, jsonify, render_template
+from flask import Blueprint, jsonify, render_template, request, abort
 from flask_login import login_required, current_user
-from sqlalchemy import func
-from utils import nudge_for_items, estimate_impacts, nudge_for_user, community_impact_summary
+from utils import nudge_for_items, cached_nudge_for_user, cached_community_summary, cached_community_stats
+from cache import aggregate_cache_stats
+import dedup
+from leaderboard import top_users, user_rank, users_around
+from replica import replica_reads
+import models
+import app_setup
 
 community_bp = Blueprint("community", __name__)
 @community_bp.route('/community')
 @login_required
+@replica_reads()
 def community_page():
-    nudge = nudge_for_user(current_user.id)
-    community = community_impact_summary()
+    nudge = cached_nudge_for_user(current_user.id)
+    community = cached_community_summary()
     return render_template('community.html', nudge=nudge, community=community)
-import models
 
 
 @community_bp.route('/api/community/stats')
 @login_required
+@replica_reads()
 def api_community_stats():
-    total_items = (models.db.session.query(func.sum(models.PlasticLog.quantity)).scalar() or 0)
-    total_logs = models.PlasticLog.query.count()
-    total_users = models.User.query.count()
-    total_points = (models.db.session.query(func.sum(models.PointsLog.delta)).scalar() or 0)
-    imp = estimate_impacts(total_items)
-    return jsonify({"ok": True,
-        "community": {"total_items": total_items, "total_logs": total_logs, "total_users": total_users, "total_points": total_points},
-        "impact": imp
-    })
+    return jsonify({"ok": True, **cached_community_stats()})
+
+@community_bp.route('/api/community/cache-stats')
+@login_required
+def api_cache_stats():
+    if current_user.role != 'admin':
+        abort(403)
+    return jsonify({"ok": True, "aggregates": aggregate_cache_stats(), "scan_dedup": dedup.stats()})
+
+@community_bp.route('/api/leaderboard')
+@login_required
+@replica_reads()
+def api_leaderboard():
+    n = min(max(request.args.get('n', 10, type=int), 1), 100)
+    return jsonify({"ok": True, "leaderboard": top_users(n)})
+
+@community_bp.route('/api/leaderboard/me')
+@login_required
+@replica_reads()
+def api_leaderboard_me():
+    radius = min(max(request.args.get('radius', 2, type=int), 0), 25)
+    return jsonify({"ok": True, "rank": user_rank(current_user.id),
+                    "around": users_around(current_user.id, radius)})
 
 @community_bp.route('/api/nudges')
 @login_required
 def api_nudges():
-    my_items = sum(l.quantity for l in models.PlasticLog.query.filter_by(user_id=current_user.id).all())
-    return jsonify({"ok": True, "nudge": {"message": nudge_for_items(my_items), "items": my_items}})
+    rows = app_setup.db.session.query(models.UserItemRollup.item, models.UserItemRollup.quantity) \
+        .filter(models.UserItemRollup.user_id == current_user.id).all()
+    return jsonify({"ok": True, "nudge": {"message": nudge_for_items([item for item, _ in rows if item]),
+                                          "items": sum(quantity for _, quantity in rows)}})
@@ -1,35 +1,108 @@
-from flask import Blueprint, jsonify, request, render_template,url_for,redirect
+import base64
+import hashlib
+import json
+from datetime import datetime
+from flask import Blueprint, jsonify, request, render_template,url_for,redirect,current_app,flash
 from flask_login import login_required, current_user
+from sqlalchemy import func, tuple_
 from app_setup import db
 import models
-from utils import calculate_points
+from utils import add_points, record_plastic
+from ingest import ingest_bin_events, resolve_bins
+import dedup
+import write_queue
 
 plastic_bp = Blueprint("plastic", __name__)
 
-SMART_BIN_MAP = {
-    'BIN001': ('Plastic Bottle', 1, 'bottle'),
-    'BIN002': ('Plastic Bag', 1, 'bag'),
-    'BIN003': ('Food Container', 1, 'container'),
-}
 
+def _encode_cursor(log):
+    return base64.urlsafe_b64encode(f"{log.created_at.isoformat()}|{log.id}".encode()).decode()
+
+def _decode_cursor(cursor):
+    created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(log_id)
+
+# Newest first, keyset-paginated on (created_at, id).
+# ?limit=N&cursor=<next_cursor>&since=<ISO timestamp>; supports ETag / If-None-Match.
+# No Last-Modified: backdated inserts (bulk ingest) don't move max(created_at) forward.
 @plastic_bp.route('/api/plastic/logs')
 @login_required
 def get_logs():
-    logs = models.PlasticLog.query.filter_by(user_id=current_user.id).all()
-    return jsonify({"logs":[{"id":l.id,"item":l.item,"quantity":l.quantity} for l in logs]})
+    limit = min(max(request.args.get('limit', 50, type=int), 1), current_app.config['LOGS_API_MAX_LIMIT'])
+    try:
+        cursor = _decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid cursor or since"}), 400
+
+    # Cheap fingerprint of the user's logs; lets unchanged polls skip the page query
+    max_id, count = db.session.query(func.max(models.PlasticLog.id), func.count(models.PlasticLog.id)) \
+        .filter(models.PlasticLog.user_id == current_user.id).one()
+    etag = hashlib.sha1(f"{max_id}:{count}:{request.query_string.decode()}".encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        q = models.PlasticLog.query.filter_by(user_id=current_user.id)
+        if since:
+            q = q.filter(models.PlasticLog.created_at > since)
+        if cursor:
+            q = q.filter(tuple_(models.PlasticLog.created_at, models.PlasticLog.id) < cursor)
+        logs = q.order_by(models.PlasticLog.created_at.desc(), models.PlasticLog.id.desc()).limit(limit + 1).all()
+        next_cursor = _encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+        response = jsonify({"logs": [{"id": l.id, "item": l.item, "quantity": l.quantity,
+                                      "created_at": l.created_at.isoformat()} for l in logs[:limit]],
+                            "next_cursor": next_cursor})
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @plastic_bp.route('/plastic/add', methods=['GET', 'POST'])
 @login_required
 def add_log():
     if request.method == 'POST':
         item = (request.form.get('item') or '').strip()
+        code = (request.form.get('code') or '').strip()  # scanned bin code (scan.html)
         qty = int(request.form.get('quantity',1))
+        if code and not item:
+            item = resolve_bins([code]).get(code) or ''
         if not item:
             return render_template('dashboard.html', error="Item required")
-        log = models.PlasticLog(item=item, quantity=qty, user_id=current_user.id)
-        db.session.add(log)
-        db.session.add(models.PointsLog(user_id=current_user.id, delta=qty, reason='plastic_log'))
-        db.session.commit()
+        # A double scan of the same bin (or a retry) inside the dedup window is not written again
+        if code and not dedup.claim(current_user.id, code):
+            flash("Duplicate scan ignored: this bin was just scanned.", 'warning')
+            return redirect(url_for('dashboard.dashboard'))
+        try:
+            if current_app.config['WRITE_COALESCING']:
+                write_queue.log_plastic(current_user.id, item, qty)
+            else:
+                record_plastic(current_user.id, item, qty)
+                add_points(current_user.id, qty, 'plastic_log')
+                db.session.commit()
+        except Exception:
+            if code:
+                dedup.release(current_user.id, code)
+            raise
         return redirect(url_for('dashboard.dashboard'))
     return render_template('add_plastic.html')
 
+# Smart bins post bursts of events: NDJSON (application/x-ndjson) or a JSON array.
+# Each event: {"event_id", "bin_code", "item"?, "quantity"?, "timestamp"?}
+@plastic_bp.route('/api/plastic/bulk', methods=['POST'])
+@login_required
+def bulk_ingest():
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            events = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            return jsonify({"ok": False, "error": "Invalid NDJSON"}), 400
+    else:
+        payload = request.get_json(silent=True)
+        events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        return jsonify({"ok": False, "error": "Expected a list of events"}), 400
+    if len(events) > current_app.config['BULK_INGEST_MAX_EVENTS']:
+        return jsonify({"ok": False, "error": "Too many events in one batch"}), 413
+    # Admin gateways may attribute events to other users via "user_id"
+    result = ingest_bin_events(events, current_user.id, allow_user=current_user.role == 'admin')
+    return jsonify({"ok": True, **result})
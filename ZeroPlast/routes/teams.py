@@ -1,19 +1,39 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from collections import defaultdict
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 import models
 import app_setup
+import rollups
+from utils import calculate_points
+from leaderboard import invalidate_challenge_leaderboards
+from signals import history_changed, send_after_commit
+from replica import replica_reads
 
 teams_bp = Blueprint("teams", __name__)
 
 @teams_bp.route('/teams', methods=['GET', 'POST'])
 @login_required
 def teams():
-    teams = models.Team.query.all()
+    # Three queries whatever the number of teams and members; each team lists
+    # only its TEAM_MEMBERS_SHOWN newest members
+    teams = app_setup.db.session.query(models.Team, models.TeamStats) \
+        .outerjoin(models.TeamStats, models.TeamStats.team_id == models.Team.id) \
+        .order_by(models.Team.name).all()
+    members = defaultdict(list)
+    for team_id, username in app_setup.db.session.execute(rollups.newest_members(current_app.config['TEAM_MEMBERS_SHOWN'])):
+        members[team_id].append(username)
     joined_team = None
     membership = models.TeamMembership.query.filter_by(user_id=current_user.id).first()
     if membership:
-        joined_team = models.Team.query.get(membership.team_id)
-    return render_template('teams.html', teams=teams, joined_team=joined_team)
+        joined_team = next((team for team, _ in teams if team.id == membership.team_id), None)
+    return render_template('teams.html', teams=teams, members=members, joined_team=joined_team)
+
+@teams_bp.route('/api/teams/leaderboard')
+@login_required
+@replica_reads()
+def team_leaderboard():
+    n = min(max(request.args.get('n', 10, type=int), 1), 100)
+    return jsonify({"ok": True, "leaderboard": rollups.team_leaderboard(n)})
 
 @teams_bp.route('/teams/join', methods=['POST'])
 @login_required
@@ -30,10 +50,18 @@ def join():
         flash('You are already a member of a team.', 'info')
         return redirect(url_for('teams.teams'))
     
+    team = models.Team.query.get(team_id)
+    if not team:
+        flash('Team not found.', 'danger')
+        return redirect(url_for('teams.teams'))
+
     # Create a new membership
-    membership = models.TeamMembership(user_id=current_user.id, team_id=team_id)
+    membership = models.TeamMembership(user_id=current_user.id, team_id=team.id)
     app_setup.db.session.add(membership)
+    rollups.record_team_join(team.id, calculate_points(current_user.id))
+    send_after_commit(history_changed)  # team series follow current membership
     app_setup.db.session.commit()
+    invalidate_challenge_leaderboards()
     flash('You have joined the team!', 'success')
     return redirect(url_for('teams.teams'))
 
@@ -55,7 +83,10 @@ def leave():
 
     # Delete the membership
     app_setup.db.session.delete(membership)
+    rollups.record_team_leave(membership.team_id, calculate_points(current_user.id))
+    send_after_commit(history_changed)
     app_setup.db.session.commit()
+    invalidate_challenge_leaderboards()
     flash('You have left the team!', 'success')
     return redirect(url_for('teams.teams'))
 
@@ -76,6 +107,8 @@ def create():
     # Create the new team
     team = models.Team(name=name)
     app_setup.db.session.add(team)
+    app_setup.db.session.flush()
+    app_setup.db.session.add(models.TeamStats(team_id=team.id, member_count=0, points=0))
     app_setup.db.session.commit()
     flash('Team created successfully!', 'success')
     return redirect(url_for('teams.teams'))
@@ -0,0 +1,40 @@
+from blinker import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app_setup import db
+
+_signals = Namespace()
+
+# Sent once a transaction that wrote PointsLog rows has committed.
+points_changed = _signals.signal('points-changed')
+# Sent once a transaction that changed the ItemType catalog has committed.
+catalog_changed = _signals.signal('catalog-changed')
+# Sent once a transaction that changed a User (user_id) or any Vendor (user_id=None) has committed.
+identity_changed = _signals.signal('identity-changed')
+# Sent once a transaction that rewrote already-closed history (backdated logs,
+# team membership changes) has committed.
+history_changed = _signals.signal('history-changed')
+
+
+def send_after_commit(signal, **kwargs):
+    """Queue `signal` to be sent after the current db.session transaction commits."""
+    db.session.info.setdefault('pending_signals', []).append((signal, kwargs))
+
+
+@event.listens_for(Session, 'after_commit')
+def _commit_pending(session):
+    session.info['committed_signals'] = session.info.pop('pending_signals', [])
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _send_committed(session, transaction):
+    # Sent once the transaction has released its connection, so receivers
+    # that query (or run eager jobs) never hold two pool connections at once
+    if transaction.parent is None:
+        for signal, kwargs in session.info.pop('committed_signals', []):
+            signal.send(**kwargs)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('pending_signals', None)
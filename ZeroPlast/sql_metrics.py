@@ -0,0 +1,106 @@
+"""
+Per-request SQL instrumentation.
+
+Every statement run while handling a request is timed and counted by its
+shape (the SQL text with bound parameters, IN-lists collapsed). When one
+shape repeats more than SQL_REPEAT_THRESHOLD times in a request, that's
+almost always an N+1 loop and gets logged. Per-endpoint totals feed the
+admin metrics page; with DEBUG (or SQL_METRICS_HEADERS) each response also
+carries X-DB-Queries / X-DB-Time-ms / X-DB-Repeated headers.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+_endpoints = {}  # endpoint -> running totals, see _record()
+
+
+def statement_shape(statement: str) -> str:
+    """Collapse whitespace and `IN (?, ?, ...)` lists so equivalent queries compare equal."""
+    return _IN_LIST.sub('(?)', _SPACE.sub(' ', statement).strip())
+
+
+def init_sql_metrics(app):
+    if not app.config['SQL_METRICS']:
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_execute)
+    app.after_request(_after_request)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started or not has_request_context():
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = g.get('sql_stats')
+    if stats is None:
+        stats = g.sql_stats = {"count": 0, "seconds": 0.0, "shapes": Counter()}
+    stats["count"] += 1
+    stats["seconds"] += elapsed
+    stats["shapes"][statement_shape(statement)] += 1
+
+
+def _after_request(response):
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    threshold = current_app.config['SQL_REPEAT_THRESHOLD']
+    endpoint = request.endpoint or '<unmatched>'
+    shape, repeats = stats["shapes"].most_common(1)[0]
+    if repeats > threshold:
+        log.warning("Possible N+1 in %s: statement ran %d times: %s", endpoint, repeats, shape[:300])
+    _record(endpoint, stats["count"], stats["seconds"], shape if repeats > threshold else None, repeats)
+    if current_app.config['SQL_METRICS_HEADERS'] or current_app.debug:
+        response.headers['X-DB-Queries'] = str(stats["count"])
+        response.headers['X-DB-Time-ms'] = f"{stats['seconds'] * 1000:.1f}"
+        response.headers['X-DB-Repeated'] = str(repeats)
+    return response
+
+
+def _record(endpoint, queries, seconds, repeated_shape, repeats):
+    with _lock:
+        row = _endpoints.get(endpoint)
+        if row is None:
+            row = _endpoints[endpoint] = {"requests": 0, "queries": 0, "seconds": 0.0, "max_queries": 0,
+                                          "n_plus_one": 0, "worst_shape": None, "worst_repeats": 0}
+        row["requests"] += 1
+        row["queries"] += queries
+        row["seconds"] += seconds
+        row["max_queries"] = max(row["max_queries"], queries)
+        if repeated_shape:
+            row["n_plus_one"] += 1
+            if repeats >= row["worst_repeats"]:
+                row["worst_shape"], row["worst_repeats"] = repeated_shape, repeats
+
+
+def endpoint_stats() -> list[dict]:
+    """Per-endpoint aggregates, most queries per request first."""
+    with _lock:
+        rows = [dict(row, endpoint=endpoint) for endpoint, row in _endpoints.items()]
+    for row in rows:
+        row["avg_queries"] = round(row["queries"] / row["requests"], 1)
+        row["avg_db_ms"] = round(row["seconds"] * 1000 / row["requests"], 2)
+    return sorted(rows, key=lambda r: r["avg_queries"], reverse=True)
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
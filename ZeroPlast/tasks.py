@@ -0,0 +1,221 @@
+"""
+Background jobs.
+
+Request handlers call `enqueue('name', *args)` and read results from wherever
+the job leaves them (chart files, the aggregate cache, rollup tables).
+TASK_BROKER picks how jobs run:
+
+    eager    inline, before enqueue() returns (tests, scripts)
+    thread   in-process queue drained by TASK_WORKERS daemon threads (default)
+    sqlite   rows in the task_job table, drained by `flask --app main run-tasks`
+    celery   Celery on CELERY_BROKER_URL; run `celery -A tasks worker`
+
+Every job runs in its own app context (and so its own db session), and
+arguments must be JSON-serializable. Enqueue after committing: jobs read
+committed data, and the sqlite broker writes on its own connection.
+"""
+import json
+import logging
+import queue
+import threading
+from flask import current_app
+import models
+from app_setup import db
+
+log = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(fn):
+    """Register `fn` as a job under its function name."""
+    _registry[fn.__name__] = fn
+    return fn
+
+
+def enqueue(name, *args, key=None):
+    """
+    Schedule job `name` with `args`. Jobs sharing a `key` are coalesced while
+    one is still waiting to run.
+    """
+    if name not in _registry:
+        raise KeyError(f"unknown task {name!r}")
+    broker = current_app.config['TASK_BROKER']
+    app = current_app._get_current_object()
+    if broker == 'eager':
+        _run(app, name, list(args))
+    elif broker == 'thread':
+        _thread_pool(app).submit(name, list(args), key)
+    elif broker == 'sqlite':
+        _enqueue_sqlite(name, list(args), key)
+    elif broker == 'celery':
+        celery_app(app).send_task(f"zeroplast.{name}", args=list(args))
+    else:
+        raise ValueError(f"unknown TASK_BROKER {broker!r}")
+
+
+def _run(app, name, args):
+    with app.app_context():
+        try:
+            return _registry[name](*args)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+# -----------------------------
+# thread broker
+# -----------------------------
+class _ThreadPool:
+    def __init__(self, app, workers):
+        self.app = app
+        self.queue = queue.Queue()
+        self.pending = set()  # keys of queued jobs
+        self.lock = threading.Lock()
+        for n in range(workers):
+            threading.Thread(target=self._work, name=f"task-worker-{n}", daemon=True).start()
+
+    def submit(self, name, args, key):
+        if key is not None:
+            with self.lock:
+                if key in self.pending:
+                    return
+                self.pending.add(key)
+        self.queue.put((name, args, key))
+
+    def _work(self):
+        while True:
+            name, args, key = self.queue.get()
+            if key is not None:
+                with self.lock:
+                    self.pending.discard(key)
+            try:
+                _run(self.app, name, args)
+            except Exception:
+                log.exception("task %s%r failed", name, tuple(args))
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        self.queue.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _thread_pool(app):
+    # Workers start on first use, not at import: keeps cold starts fast
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _ThreadPool(app, app.config['TASK_WORKERS'])
+    return _pool
+
+
+def wait_for_tasks():
+    """Block until the thread broker's queue is empty (scripts and benchmarks)."""
+    if _pool is not None:
+        _pool.join()
+
+
+# -----------------------------
+# sqlite broker
+# -----------------------------
+def _enqueue_sqlite(name, args, key):
+    jobs = models.TaskJob.__table__
+    with db.engine.begin() as conn:
+        if key is not None and conn.execute(
+                db.select(jobs.c.id).where(jobs.c.key == key, jobs.c.status == 'queued').limit(1)).first():
+            return
+        conn.execute(jobs.insert().values(name=name, args=json.dumps(args), key=key, status='queued'))
+
+
+def run_sqlite_jobs(max_jobs=None, max_attempts=3):
+    """
+    Claim and run queued task_job rows until none are left (or `max_jobs`).
+    Finished jobs are deleted; a job that fails `max_attempts` times stays
+    behind as 'failed' with its traceback. Returns (done, failed).
+    """
+    import traceback
+    jobs = models.TaskJob.__table__
+    app = current_app._get_current_object()
+    done = failed = 0
+    while max_jobs is None or done + failed < max_jobs:
+        with db.engine.begin() as conn:
+            row = conn.execute(db.select(jobs.c.id, jobs.c.name, jobs.c.args, jobs.c.attempts)
+                               .where(jobs.c.status == 'queued').order_by(jobs.c.id).limit(1)).first()
+            if row is None:
+                break
+            claimed = conn.execute(jobs.update().where(jobs.c.id == row.id, jobs.c.status == 'queued')
+                                   .values(status='running', attempts=jobs.c.attempts + 1)).rowcount
+        if not claimed:
+            continue  # another worker took it
+        try:
+            _run(app, row.name, json.loads(row.args))
+        except Exception:
+            failed += 1
+            status = 'failed' if row.attempts + 1 >= max_attempts else 'queued'
+            with db.engine.begin() as conn:
+                conn.execute(jobs.update().where(jobs.c.id == row.id)
+                             .values(status=status, error=traceback.format_exc()))
+        else:
+            done += 1
+            with db.engine.begin() as conn:
+                conn.execute(jobs.delete().where(jobs.c.id == row.id))
+    return done, failed
+
+
+# -----------------------------
+# celery broker (optional dependency)
+# -----------------------------
+_celery = None
+
+
+def celery_app(app=None):
+    """The Celery app wrapping every registered task; built on first use."""
+    global _celery
+    if _celery is None:
+        from celery import Celery
+        if app is None:
+            from main import app
+        _celery = Celery('zeroplast', broker=app.config['CELERY_BROKER_URL'])
+        for name in _registry:
+            _celery.task(name=f"zeroplast.{name}")(lambda *args, _name=name: _run(app, _name, list(args)))
+    return _celery
+
+
+def __getattr__(name):
+    # `celery -A tasks worker` looks up tasks.celery
+    if name == 'celery':
+        return celery_app()
+    raise AttributeError(name)
+
+
+# -----------------------------
+# Jobs
+# -----------------------------
+@task
+def render_chart(kind, top, title):
+    from utils import render_top3_chart
+    render_top3_chart(kind, top, title)
+
+
+@task
+def rebuild_rollups():
+    import rollups
+    rollups.backfill()
+    rollups.rebuild_team_stats()
+
+
+@task
+def rebuild_leaderboard():
+    from leaderboard import rebuild_leaderboard as rebuild
+    rebuild()
+
+
+@task
+def evict_charts():
+    import os
+    import charts
+    charts.evict_charts(os.path.join(current_app.static_folder, 'graphs'))
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import pytest
+from flask.testing import FlaskClient
+
+# The app reads its configuration at import time
+_tmp = tempfile.mkdtemp(prefix='zeroplast-tests-')
+os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(_tmp, 'test.db')}", TASK_BROKER='eager',
+                  SQL_METRICS='0', ARCHIVE_DIR=os.path.join(_tmp, 'archive'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import models  # noqa: E402
+from app_setup import db, shared_cache  # noqa: E402
+
+
+class _Client(FlaskClient):
+    def open(self, *args, **kwargs):
+        # Each request gets its own app context (and g), as under a real server;
+        # otherwise it would reuse the one the `app` fixture keeps open
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app():
+    app = main.app
+    app.config['TESTING'] = True
+    app.test_client_class = _Client
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([models.User(id=1, username='admin', email='admin@test', password='x', role='admin'),
+                            models.User(id=2, username='alice', email='alice@test', password='x', role='user')])
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        shared_cache.clear()
+
+
+@pytest.fixture
+def client_for(app):
+    def client(user_id):
+        c = app.test_client()
+        with c.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return c
+    return client
@@ -0,0 +1,30 @@
+import utils
+
+
+def test_timeseries_accepts_offsets(client_for):
+    utils.log_plastic(2, 'bottle', 3)
+    c = client_for(2)
+    r = c.get('/api/analytics/timeseries?granularity=month&end=2099-01-01T00:00:00%2B00:00')
+    assert r.status_code == 200
+    assert sum(b['value'] for b in r.json['buckets']) == 3
+    r = c.get('/api/analytics/timeseries?granularity=day&start=2024-01-01T02:00:00%2B02:00&end=2024-01-03T00:00:00Z')
+    assert r.status_code == 200
+    assert [b['start'] for b in r.json['buckets']] == ['2024-01-01', '2024-01-02']
+
+
+def test_timeseries_rejects_bad_dates(client_for):
+    assert client_for(2).get('/api/analytics/timeseries?start=yesterday').status_code == 400
+
+
+def test_backdated_write_outlives_the_cache_default_timeout(app, client_for, monkeypatch):
+    import cachelib.simple
+    from datetime import datetime
+    from app_setup import db
+    c = client_for(2)
+    url = '/api/analytics/timeseries?granularity=month&start=2024-01-01T00:00:00Z&end=2024-03-01T00:00:00Z'
+    assert [b['value'] for b in c.get(url).json['buckets']] == [0, 0]
+    utils.record_plastic(2, 'bottle', 4, created_at=datetime(2024, 2, 10))
+    db.session.commit()
+    now = cachelib.simple.time()
+    monkeypatch.setattr(cachelib.simple, 'time', lambda: now + app.config.get('CACHE_DEFAULT_TIMEOUT', 300) + 1)
+    assert [b['value'] for b in c.get(url).json['buckets']] == [0, 4]
@@ -0,0 +1,51 @@
+from datetime import datetime
+import pytest
+import analytics
+import archive
+import models
+import utils
+from app_setup import db, shared_cache
+
+MARCH, APRIL = datetime(2024, 3, 5, 12), datetime(2024, 4, 9, 8)
+
+
+@pytest.fixture
+def history(app):
+    for when, qty in ((MARCH, 20), (MARCH, 14), (APRIL, 26)):
+        utils.record_plastic(2, 'bottle', qty, created_at=when)
+        utils.add_points(2, qty, 'plastic_log', created_at=when)
+    db.session.commit()
+
+
+def _months(metric):
+    series = analytics.timeseries(metric, 'month', start=datetime(2024, 3, 1), end=datetime(2024, 5, 1),
+                                  user_id=2, now=datetime(2025, 1, 1))
+    return [b['value'] for b in series['buckets']]
+
+
+def test_archived_months_keep_per_user_series(history):
+    before = {metric: _months(metric) for metric in analytics.METRICS}
+    assert before['points'] == [34, 26]
+    assert len(list(archive.archive_logs(before=datetime(2024, 5, 1), batch_rows=2))) == 4
+    assert models.PointsLog.query.count() == 0
+    shared_cache.clear()  # compare against fresh queries, not cached buckets
+    assert {metric: _months(metric) for metric in analytics.METRICS} == before
+    assert utils.ledger_points(2) == 60
+
+    archive.rebuild_monthly_points()
+    assert _months('points') == [34, 26]
+
+
+def test_finer_buckets_over_archived_time_are_refused(history):
+    list(archive.archive_logs(before=datetime(2024, 5, 1)))
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.timeseries('points', 'day', start=datetime(2024, 3, 1), end=datetime(2024, 4, 1), user_id=2)
+
+
+@pytest.mark.parametrize('query', ['', '?start=2024-04-01', '?end=2024-03-31&user_id=2'])
+def test_export_includes_archived_rows(history, client_for, query):
+    admin = client_for(1)
+    exported = {kind: admin.get(f'/admin/admin/export/{kind}.csv{query}').data for kind in ('plastic', 'points')}
+    assert exported['plastic'].count(b'\n') > 1
+    list(archive.archive_logs(before=datetime(2024, 5, 1), batch_rows=2))
+    assert {kind: admin.get(f'/admin/admin/export/{kind}.csv{query}').data for kind in exported} == exported
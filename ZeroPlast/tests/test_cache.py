@@ -0,0 +1,38 @@
+from cache import cached_aggregate, invalidate
+
+
+def test_no_grace_recomputes_after_invalidate(app):
+    values = iter([1, 2])
+    compute = lambda: next(values)
+    assert cached_aggregate('x', compute, scope='user:1', grace=0) == 1
+    assert cached_aggregate('x', compute, scope='user:1', grace=0) == 1
+    invalidate('user:1')
+    assert cached_aggregate('x', compute, scope='user:1', grace=0) == 2
+
+
+def test_grace_serves_stale_while_refreshing(app):
+    values = iter([1, 2])
+    compute = lambda: next(values)
+    assert cached_aggregate('y', compute, scope='s', grace=60) == 1
+    invalidate('s')
+    assert cached_aggregate('y', compute, scope='s', grace=60) == 1
+
+
+def test_aggregates_are_computed_on_the_primary(app):
+    from flask import g
+    with app.test_request_context():
+        g.use_replica = True
+        assert cached_aggregate('z', lambda: g.use_replica) is False
+        assert g.use_replica is True
+
+
+def test_generation_survives_the_cache_default_timeout(app, monkeypatch):
+    import cachelib.simple
+    values = iter([1, 2])
+    compute = lambda: next(values)
+    invalidate('user:1')
+    assert cached_aggregate('w', compute, scope='user:1', ttl=3600, grace=0) == 1
+    now = cachelib.simple.time()
+    monkeypatch.setattr(cachelib.simple, 'time', lambda: now + app.config.get('CACHE_DEFAULT_TIMEOUT', 300) + 1)
+    invalidate('user:1')
+    assert cached_aggregate('w', compute, scope='user:1', ttl=3600, grace=0) == 2
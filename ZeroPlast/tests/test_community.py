@@ -0,0 +1,24 @@
+import utils
+
+
+def test_api_nudges(client_for):
+    utils.log_plastic(2, 'bottle', 3)
+    utils.log_plastic(2, 'bag', 2)
+    nudge = client_for(2).get('/community/api/nudges').json['nudge']
+    assert nudge['items'] == 5
+    assert set(nudge['message']) == {'bottle', 'bag'}
+
+
+def test_api_nudges_without_logs(client_for):
+    assert client_for(2).get('/community/api/nudges').json['nudge'] == {'message': {}, 'items': 0}
+
+
+def test_own_log_shows_in_cached_nudge_without_a_refresh_job(app, monkeypatch):
+    import tasks
+    queued = []
+    monkeypatch.setattr(tasks, '_run', lambda app, name, args: queued.append(name))
+    utils.log_plastic(2, 'bottle', 3)
+    assert utils.cached_nudge_for_user(2)['items_count'] == 3
+    utils.log_plastic(2, 'bag', 2)
+    assert utils.cached_nudge_for_user(2)['items_count'] == 5
+    assert queued == []
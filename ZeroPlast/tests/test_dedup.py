@@ -0,0 +1,42 @@
+import pytest
+import db_setup
+import dedup
+import models
+
+
+@pytest.fixture
+def scans(app, monkeypatch):
+    db_setup.seed_smart_bins()
+    monkeypatch.setattr(dedup, '_windows', None)  # no windows left over from other tests
+    monkeypatch.setitem(app.config, 'SCAN_DEDUP_WINDOW', 10)
+
+
+def test_repeated_scan_is_ignored(scans, client_for):
+    c = client_for(2)
+    c.post('/plastic/plastic/add', data={'code': 'BIN001'})
+    r = c.post('/plastic/plastic/add', data={'code': 'BIN001'}, follow_redirects=True)
+    assert b'Duplicate scan ignored' in r.data
+    assert models.PlasticLog.query.count() == 1
+    client_for(1).post('/plastic/plastic/add', data={'code': 'BIN001'})  # another user
+    assert models.PlasticLog.query.count() == 2
+
+
+def test_manual_logs_are_not_deduplicated(scans, client_for):
+    c = client_for(2)
+    c.post('/plastic/plastic/add', data={'item': 'bottle', 'quantity': 1})
+    c.post('/plastic/plastic/add', data={'item': 'bottle', 'quantity': 3})
+    assert [log.quantity for log in models.PlasticLog.query.order_by(models.PlasticLog.id)] == [1, 3]
+
+
+def test_sub_second_shared_window_expires(scans, app, monkeypatch):
+    import time
+    from app_setup import shared_cache
+    monkeypatch.setitem(app.config, 'SCAN_DEDUP_WINDOW', 0.2)
+    monkeypatch.setitem(app.config, 'SCAN_DEDUP_SHARED', True)
+    timeouts = []
+    add = shared_cache.add
+    monkeypatch.setattr(shared_cache, 'add', lambda key, value, timeout: timeouts.append(timeout) or add(key, value, timeout))
+    assert dedup.claim(2, 'BIN001')
+    assert timeouts == [1]
+    time.sleep(1.1)
+    assert dedup.claim(2, 'BIN001')
@@ -0,0 +1,27 @@
+import pytest
+import impact
+
+
+@pytest.fixture
+def catalog(app):
+    impact.seed_item_types()
+    impact.engine.invalidate()
+
+
+@pytest.mark.parametrize('counts', [{}, {'bottle': 3}, {'Bottle': 2, 'bag': 5, 'mystery': 4}, {'cup': 0}])
+def test_single_estimate_matches_bulk_without_numpy(catalog, monkeypatch, counts):
+    bulk = impact.engine.estimate_many((None, item, qty) for item, qty in counts.items()).get(
+        None, {"plastic_kg": 0, "co2_kg": 0, "landfill_l": 0, "marine_lives_saved": 0})
+    monkeypatch.setattr(impact, '_numpy', lambda: pytest.fail("numpy imported for a single estimate"))
+    impact.engine.invalidate()
+    # NumPy rounds halves to even, Python's round() rounds the binary value: allow one step of
+    # the coarsest (2-decimal) rounding
+    assert impact.estimate(counts) == pytest.approx(bulk, abs=0.01)
+
+
+def test_catalog_has_no_invented_factors(catalog):
+    import db_setup
+    db_setup.seed_smart_bins()  # adds the 'container' item type for BIN003
+    impact.engine.invalidate()
+    weight, co2, landfill = impact.engine.factors()['container']
+    assert (co2, landfill) == (0.0, 0.0)
@@ -0,0 +1,18 @@
+from datetime import datetime
+import utils
+
+
+def test_backdated_insert_changes_the_etag(client_for):
+    utils.log_plastic(2, 'bottle', 1)
+    c = client_for(2)
+    first = c.get('/plastic/api/plastic/logs')
+    assert 'Last-Modified' not in first.headers
+    assert c.get('/plastic/api/plastic/logs', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    utils.record_plastic(2, 'bag', 2, created_at=datetime(2020, 1, 1))  # e.g. a bulk-ingested old event
+    utils.add_points(2, 2, 'smart_bin', created_at=datetime(2020, 1, 1))
+    utils.db.session.commit()
+    r = c.get('/plastic/api/plastic/logs', headers={'If-None-Match': first.headers['ETag'],
+                                                    'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert r.status_code == 200
+    assert len(r.json['logs']) == 2
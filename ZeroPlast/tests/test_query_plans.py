@@ -0,0 +1,53 @@
+from sqlalchemy import event
+import query_plans
+import utils
+from app_setup import db
+
+# Views on every user's path; their warm-cache SQL must not walk a whole table
+HOT_URLS = [
+    '/dashboard',
+    '/plastic/api/plastic/logs',
+    '/community/community',
+    '/community/api/nudges',
+    '/community/api/leaderboard/me',
+    '/api/analytics/timeseries?granularity=week',
+    '/api/analytics/timeseries?user_id=2&granularity=day',
+    '/api/analytics/timeseries?user_id=2&granularity=month&metric=points',
+    '/rewards/rewards',
+    '/challenges',
+    '/api/teams/leaderboard',
+    '/teams',
+]
+# Small, admin-curated tables that pages list in full
+LISTED_TABLES = {'reward', 'challenge', 'team'}
+
+
+def test_hot_queries_use_indexes(app):
+    assert [(name, scans) for name, _, scans in query_plans.check_query_plans() if scans] == []
+
+
+def test_hot_routes_only_run_indexed_queries(client_for):
+    utils.log_plastic(2, 'bottle', 3)
+    c = client_for(2)
+    for url in HOT_URLS:  # warm the caches, the leaderboard board and the impact factors
+        assert c.get(url).status_code == 200, url
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for url in HOT_URLS:
+            c.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    tables = set(db.metadata.tables) - LISTED_TABLES
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            scans += [(line, statement) for line in query_plans.full_scans(plan, tables)]
+    assert statements and scans == []
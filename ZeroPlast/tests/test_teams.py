@@ -0,0 +1,16 @@
+import models
+import rollups
+from app_setup import db
+
+
+def test_teams_page_lists_only_the_newest_members(app, client_for, monkeypatch):
+    monkeypatch.setitem(app.config, 'TEAM_MEMBERS_SHOWN', 2)
+    db.session.add_all([models.User(id=uid, username=f"user{uid}", email=f"user{uid}@test", password='x', role='user')
+                        for uid in (3, 4)])
+    db.session.add(models.Team(id=1, name='Reef'))
+    db.session.add_all(models.TeamMembership(user_id=uid, team_id=1) for uid in (2, 3, 4))
+    db.session.commit()
+    rollups.rebuild_team_stats()
+    html = client_for(1).get('/teams').get_data(as_text=True)
+    assert 'user3' in html and 'user4' in html and 'alice' not in html
+    assert 'and 1 more' in html
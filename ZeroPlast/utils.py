@@ -1,13 +1,20 @@
 import models
-from sqlalchemy import func, distinct
+import rollups
+import archive
+import impact
+from sqlalchemy import func, distinct, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from flask import current_app
 from app_setup import db
-from collections import Counter
+from signals import history_changed, points_changed, send_after_commit
+from cache import cached_aggregate, invalidate
+from tasks import enqueue
+from replica import note_write
+from collections import Counter, defaultdict
 import os
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for thread/process safety
-import matplotlib.pyplot as plt
-import io
-import base64
+from charts import cached_chart, chart_file, svg_bar_chart, svg_line_chart, write_svg
+from datetime import datetime, timedelta
+import time
 
 
 # -----------------------------
@@ -18,41 +25,19 @@ def estimate_impacts_from_counts(counts: dict) -> dict:
     Estimate environmental impacts from item counts.
     Returns dict with plastic_kg, co2_kg, landfill_l, marine_lives_saved.
     """
-    factors = {
-        "bottle": {"plastic_kg": 0.02, "co2_kg": 0.054, "landfill_l": 0.05},
-        "bag":    {"plastic_kg": 0.01, "co2_kg": 0.027, "landfill_l": 0.02},
-        "cup":    {"plastic_kg": 0.015, "co2_kg": 0.04,  "landfill_l": 0.03},
-        "straw":  {"plastic_kg": 0.005, "co2_kg": 0.01,  "landfill_l": 0.005},
-    }
-    total = {"plastic_kg": 0.0, "co2_kg": 0.0, "landfill_l": 0.0}
-    total_items = 0
-    for item, count in counts.items():
-        f = factors.get(item.lower(), {"plastic_kg": 0, "co2_kg": 0, "landfill_l": 0})
-        total["plastic_kg"] += f["plastic_kg"] * count
-        total["co2_kg"] += f["co2_kg"] * count
-        total["landfill_l"] += f["landfill_l"] * count
-        total_items += count
-    total["plastic_kg"] = round(total["plastic_kg"], 3)
-    total["co2_kg"] = round(total["co2_kg"], 3)
-    total["landfill_l"] = round(total["landfill_l"], 3)
-    total["marine_lives_saved"] = max(0, round(total_items * 0.005, 2))
-    return total
+    return impact.estimate(counts)
 
 def nudge_for_user(user_id: int) -> dict:
     """
     Generate a friendly nudge for the user based on their plastic log history.
     Returns dict with message, details, items_count.
     """
-    from models import PlasticLog
-    counts = {}
-    total_items = 0
-    # Group by item and sum quantity
-    rows = db.session.query(PlasticLog.item, func.sum(PlasticLog.quantity)) \
-        .filter(PlasticLog.user_id == user_id) \
-        .group_by(PlasticLog.item).all()
-    for item, count in rows:
-        counts[item] = int(count)
-        total_items += int(count)
+    rows = db.session.query(models.UserItemRollup.item, models.UserItemRollup.quantity) \
+        .filter(models.UserItemRollup.user_id == user_id).all()
+    return _nudge_from_counts({item: int(count) for item, count in rows})
+
+def _nudge_from_counts(counts: dict) -> dict:
+    total_items = sum(counts.values())
     details = estimate_impacts_from_counts(counts)
     if total_items >= 50:
         msg = f"Amazing — you’ve avoided ~{details['plastic_kg']} kg plastic and ~{details['co2_kg']} kg CO₂e. Keep leading!"
@@ -62,24 +47,43 @@ def nudge_for_user(user_id: int) -> dict:
         msg = "Tip: Scan via QR for quicker logging. Try refill stations to cut more plastic."
     return {"message": msg, "details": details, "items_count": total_items, "by_item": counts}
 
+def user_summary(user_id: int, recent: int = 10) -> dict:
+    """
+    Everything the dashboard shows for a user, from bounded reads: the
+    per-user rollups (one row per item, at most 10 day rows), the last
+    `recent` logs and the points balance. Cost doesn't grow with history.
+    Returns dict with points, today, week, recent, by_item, top_items, top_days, nudge.
+    """
+    today = datetime.utcnow().date()
+    daily = models.UserDailyRollup
+    week = dict(db.session.query(daily.day, daily.quantity)
+                .filter(daily.user_id == user_id, daily.day >= today - timedelta(days=6)).all())
+    top_days = db.session.query(daily.day, daily.quantity).filter(daily.user_id == user_id) \
+        .order_by(daily.quantity.desc(), daily.day.desc()).limit(3).all()
+    by_item = {item: int(q) for item, q in db.session.query(models.UserItemRollup.item,
+                                                            models.UserItemRollup.quantity)
+               .filter(models.UserItemRollup.user_id == user_id)}
+    recent_logs = models.PlasticLog.query.filter_by(user_id=user_id) \
+        .order_by(models.PlasticLog.created_at.desc(), models.PlasticLog.id.desc()).limit(recent).all()
+    return {"points": calculate_points(user_id),
+            "today": week.get(today, 0),
+            "week": sum(week.values()),
+            "recent": recent_logs,
+            "by_item": by_item,
+            "top_items": Counter(by_item).most_common(3),
+            "top_days": [(d.strftime('%Y-%m-%d'), q) for d, q in top_days],
+            "nudge": _nudge_from_counts(by_item)}
+
 def community_impact_summary() -> dict:
     """
     Aggregate community impact and stats.
     Returns dict with total_items, unique_users, total_points, impact, by_item.
     """
-    from models import PlasticLog, User, PointsLog
-    # By item
-    by_item = {}
-    total_items = 0
-    rows = db.session.query(PlasticLog.item, func.sum(PlasticLog.quantity)) \
-        .group_by(PlasticLog.item).all()
-    for item, count in rows:
-        by_item[item] = int(count)
-        total_items += int(count)
-    # Unique users
-    unique_users = db.session.query(func.count(distinct(PlasticLog.user_id))).scalar() or 0
-    # Total points
-    total_points = db.session.query(func.sum(PointsLog.delta)).scalar() or 0
+    # From the rollups, which keep counting rows after they are archived
+    by_item = rollups.by_item()
+    total_items = sum(by_item.values())
+    unique_users = db.session.query(func.count(distinct(models.UserItemRollup.user_id))).scalar() or 0
+    total_points = rollups.totals()["points"]
     # Impact
     impact = estimate_impacts_from_counts(by_item)
     return {
@@ -90,38 +94,57 @@ def community_impact_summary() -> dict:
         "by_item": by_item
     }
 
-def save_graph_by_item(logs, user_id):
-    item_counts = Counter()
-    for l in logs:
-        item_counts[l.item] += l.quantity
-    top_items = item_counts.most_common(3)
-    items, counts = zip(*top_items) if top_items else ([],[])
-    fig, ax = plt.subplots()
-    ax.bar(items, counts, color=['#16a34a', '#22c55e', '#a3e635'])
-    ax.set_ylabel('Total Logged')
-    ax.set_title('Top 3 Items by Total Logged')
-    plt.tight_layout()
-    graph_path = os.path.join('static', 'graphs', f'items_{user_id}.png')
-    plt.savefig(graph_path)
-    plt.close(fig)
-    return graph_path
-
-def save_graph_by_day(logs, user_id):
-    day_counts = Counter()
-    for l in logs:
-        day = l.created_at.strftime('%Y-%m-%d')
-        day_counts[day] += l.quantity
-    top_days = day_counts.most_common(3)
-    days, counts = zip(*top_days) if top_days else ([],[])
-    fig, ax = plt.subplots()
-    ax.bar(days, counts, color=['#16a34a', '#22c55e', '#a3e635'])
-    ax.set_ylabel('Total Logged')
-    ax.set_title('Top 3 Days by Total Logged')
-    plt.tight_layout()
-    graph_path = os.path.join('static', 'graphs', f'days_{user_id}.png')
-    plt.savefig(graph_path)
-    plt.close(fig)
-    return graph_path
+def community_stats() -> dict:
+    """Community totals for the stats API, read from the daily rollups."""
+    totals = rollups.totals()
+    return {
+        "community": {"total_items": totals["items"], "total_logs": totals["logs"],
+                      "total_users": models.User.query.count(), "total_points": totals["points"]},
+        "impact": estimate_impacts(rollups.by_item()),
+    }
+
+def cached_community_summary() -> dict:
+    return cached_aggregate('community_summary', community_impact_summary)
+
+def cached_community_stats() -> dict:
+    return cached_aggregate('community_stats', community_stats)
+
+def cached_nudge_for_user(user_id: int) -> dict:
+    # No grace: a user should see their own log reflected straight away
+    return cached_aggregate(f'nudge:{user_id}', lambda: nudge_for_user(user_id),
+                            scope=f'user:{user_id}', grace=0)
+
+@points_changed.connect
+def _invalidate_aggregates(sender, user_id=None, **kwargs):
+    # Every PlasticLog write also writes points, so this covers both tables
+    invalidate('community')
+    invalidate(f'user:{user_id}')
+    note_write(user_id)  # keep this user's replica reads on the primary until the replica catches up
+
+def save_graph_by_item(top_items):
+    """Chart of the user's top 3 items, [(item, quantity)] as in user_summary()."""
+    return _top3_chart('items', top_items, 'Top 3 Items by Total Logged')
+
+def save_graph_by_day(top_days):
+    """Chart of the user's top 3 days, [('YYYY-MM-DD', quantity)] as in user_summary()."""
+    return _top3_chart('days', top_days, 'Top 3 Days by Total Logged')
+
+def _top3_chart(kind, top, title):
+    """Static path of the chart, or None while a background job renders it."""
+    top = [list(row) for row in top]
+    static_path, target = chart_file(kind, top, ext='svg')
+    try:
+        os.utime(target)  # mark as recently used for eviction
+    except FileNotFoundError:
+        enqueue('render_chart', kind, top, title, key=static_path)
+        if not os.path.exists(target):
+            return None
+    return static_path
+
+def render_top3_chart(kind, top, title):
+    labels, counts = zip(*top) if top else ([],[])
+    return cached_chart(kind, top, lambda path: write_svg(
+        svg_bar_chart(labels, counts, title=title, ylabel='Total Logged'), path), ext='svg')
 
 
 # -----------------------------
@@ -129,19 +152,170 @@ def save_graph_by_day(logs, user_id):
 # -----------------------------
 def log_plastic(user_id, item, quantity, reason="Plastic log"):
     """Log plastic usage and award points."""
-    log = models.PlasticLog(item=item, quantity=quantity, user_id=user_id)
-    points = models.PointsLog(user_id=user_id, delta=quantity, reason=reason)
-    db.session.add(log)
-    db.session.add(points)
+    record_plastic(user_id, item, quantity)
+    add_points(user_id, quantity, reason)
     db.session.commit()
     return quantity
 
 
+def record_plastic(user_id, item, quantity, created_at=None):
+    """
+    Add a PlasticLog entry and bump the daily item rollup.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    created_at = created_at or datetime.utcnow()
+    log = models.PlasticLog(item=item, quantity=quantity, user_id=user_id, created_at=created_at)
+    db.session.add(log)
+    rollups.record_item(created_at.date(), item, quantity)
+    if user_id is not None:
+        rollups.record_user_item(user_id, created_at.date(), item, quantity)
+    _note_backdated(created_at)
+    return log
+
+
+def record_plastic_batch(entries):
+    """
+    record_plastic + add_points(quantity) for many entries at once, applying
+    one balance / rollup increment per key instead of one per entry.
+    entries: [{"user_id", "item", "quantity", "created_at"?, "reason"}]
+    Runs inside the caller's transaction; the caller commits.
+    """
+    now = datetime.utcnow()
+    points = defaultdict(int)
+    items = defaultdict(lambda: [0, 0])
+    days = defaultdict(lambda: [0, 0])
+    user_items = defaultdict(lambda: [0, 0])
+    for e in entries:
+        day = (e.get("created_at") or now).date()
+        items[(day, e["item"])][0] += e["quantity"]
+        items[(day, e["item"])][1] += 1
+        user_items[(e["user_id"], day, e["item"])][0] += e["quantity"]
+        user_items[(e["user_id"], day, e["item"])][1] += 1
+        points[e["user_id"]] += e["quantity"]
+        days[day][0] += e["quantity"]
+        days[day][1] += 1
+    for uid, delta in points.items():
+        bump_balance(uid, delta)  # before the PointsLog rows, see bump_balance
+
+    db.session.add_all(models.PlasticLog(item=e["item"], quantity=e["quantity"], user_id=e["user_id"],
+                                         created_at=e.get("created_at") or now) for e in entries)
+    db.session.add_all(models.PointsLog(user_id=e["user_id"], delta=e["quantity"], reason=e["reason"],
+                                        created_at=e.get("created_at") or now) for e in entries)
+    for (day, item), (quantity, logs) in items.items():
+        rollups.record_item(day, item, quantity, logs=logs)
+    for (uid, day, item), (quantity, logs) in user_items.items():
+        rollups.record_user_item(uid, day, item, quantity, logs=logs)
+    for day, (delta, count) in days.items():
+        rollups.record_points(day, delta, entries=count)
+    if entries:
+        _note_backdated(min(e.get("created_at") or now for e in entries))
+    return len(entries)
+
+
+def add_points(user_id, delta, reason, created_at=None):
+    """
+    Append a PointsLog entry and apply it to the user's PointsBalance.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    created_at = created_at or datetime.utcnow()
+    bump_balance(user_id, delta)
+    db.session.add(models.PointsLog(user_id=user_id, delta=delta, reason=reason, created_at=created_at))
+    rollups.record_points(created_at.date(), delta)
+    _note_backdated(created_at)
+    return delta
+
+
+def _note_backdated(created_at):
+    # Writes into an hour that has already closed change cached analytics buckets
+    if created_at < datetime.utcnow().replace(minute=0, second=0, microsecond=0) and not any(
+            signal is history_changed for signal, _ in db.session.info.get('pending_signals', ())):
+        send_after_commit(history_changed)
+
+
+def bump_balance(user_id, delta):
+    """
+    Apply a (possibly summed) points delta to the user's PointsBalance.
+    Call it before adding the matching PointsLog rows: a missing balance is
+    seeded from the ledger, which must not already contain them. Caller commits.
+    """
+    balance = _balance_row(user_id)
+    # Let the database do the increment so concurrent writers don't lose updates
+    balance.balance = models.PointsBalance.balance + delta
+    db.session.flush()
+    rollups.record_member_points(user_id, delta)
+    send_after_commit(points_changed, user_id=user_id, delta=delta)
+
+
+def debit_points(user_id, amount, reason):
+    """
+    Take `amount` points from the user only if their balance covers it. The
+    check and the debit are a single conditional UPDATE, so there's no window
+    for a concurrent debit to slip in. Returns False (changing nothing) when
+    the balance is too low. Runs inside the caller's transaction; the caller commits.
+    """
+    now = datetime.utcnow()
+    balance = _balance_row(user_id)
+    if balance.balance < amount:
+        return False  # refused without taking the write lock; the UPDATE below still guards races
+    debited = db.session.execute(update(models.PointsBalance)
+                                 .where(models.PointsBalance.user_id == user_id,
+                                        models.PointsBalance.balance >= amount)
+                                 .values(balance=models.PointsBalance.balance - amount, updated_at=now)
+                                 .execution_options(synchronize_session=False)).rowcount
+    db.session.expire(balance)
+    if not debited:
+        return False
+    db.session.add(models.PointsLog(user_id=user_id, delta=-amount, reason=reason, created_at=now))
+    rollups.record_points(now.date(), -amount)
+    rollups.record_member_points(user_id, -amount)
+    send_after_commit(points_changed, user_id=user_id, delta=-amount)
+    return True
+
+
+def _balance_row(user_id):
+    """Fetch the user's PointsBalance, seeding it from the ledger on first use."""
+    balance = db.session.get(models.PointsBalance, user_id)
+    if balance is None:
+        balance = models.PointsBalance(user_id=user_id, balance=ledger_points(user_id))
+        db.session.add(balance)
+        db.session.flush()
+    return balance
+
+
+def ledger_points(user_id):
+    """Sum a user's PointsLog history (the source of truth for balances), archived rows included."""
+    ledger = archive.points_ledger([user_id])
+    return db.session.query(ledger.c.points).scalar() or 0
+
+
 def calculate_points(user_id):
     """Calculate total points for a user."""
-    total = db.session.query(func.sum(models.PointsLog.delta)) \
-                      .filter_by(user_id=user_id).scalar()
-    return total or 0
+    balance = db.session.get(models.PointsBalance, user_id)
+    if balance is None:
+        # Not materialized yet (no points since the balance table was added)
+        return ledger_points(user_id)
+    return balance.balance
+
+
+def reconcile_points(fix=True):
+    """
+    Rebuild PointsBalance rows from the PointsLog ledger.
+    Returns a list of (user_id, stored_balance, ledger_balance) for every
+    user whose stored balance drifted (stored is None if it was missing).
+    """
+    ledger = archive.points_ledger()
+    ledger = dict(db.session.query(ledger.c.user_id, ledger.c.points).all())
+    stored = dict(db.session.query(models.PointsBalance.user_id, models.PointsBalance.balance).all())
+    drift = []
+    for user_id in sorted(set(ledger) | set(stored)):
+        actual = int(ledger.get(user_id) or 0)
+        if stored.get(user_id) != actual:
+            drift.append((user_id, stored.get(user_id), actual))
+            if fix:
+                db.session.merge(models.PointsBalance(user_id=user_id, balance=actual))
+    if fix:
+        db.session.commit()
+    return drift
 
 
 def user_points(user_id: int) -> int:
@@ -176,46 +350,53 @@ def nudge_for_items(items: list[str]) -> dict:
 
 def estimate_impacts(items: dict) -> dict:
     """
-    Estimate environmental impacts of plastic usage.
+    Estimate environmental impacts of plastic usage, in grams.
     items = { "bottle": 3, "bag": 5 }
-    Returns dict with CO2 saved, plastic saved, etc.
+    Same factors as estimate_impacts_from_counts (the ItemType catalog).
     """
-    # rough example factors (made up for prototype!)
-    impact_factors = {
-        "bottle": {"plastic_g": 20, "co2_g": 50},
-        "bag": {"plastic_g": 10, "co2_g": 20},
-        "cup": {"plastic_g": 15, "co2_g": 40},
-        "straw": {"plastic_g": 5, "co2_g": 10},
-    }
-
-    total = {"plastic_g": 0, "co2_g": 0}
-    for item, qty in items.items():
-        factor = impact_factors.get(item.lower())
-        if factor:
-            total["plastic_g"] += factor["plastic_g"] * qty
-            total["co2_g"] += factor["co2_g"] * qty
-    
-    return total
+    kg = impact.estimate(items)
+    return {"plastic_g": round(kg["plastic_kg"] * 1000, 1), "co2_g": round(kg["co2_kg"] * 1000, 1)}
 
 
 # -----------------------------
 # Rewards
 # -----------------------------
 def redeem_reward(user_id, reward_id):
-    """Redeem a reward if enough points."""
-    reward = models.Reward.query.get(reward_id)
+    """
+    Redeem a reward for the user and commit. The stock and balance checks are
+    conditional UPDATEs, so concurrent redemptions can't overdraw either one;
+    a busy database (or a racing first-time balance seed) is retried up to
+    REDEEM_MAX_RETRIES times. Returns (ok, message).
+    """
+    attempts = current_app.config['REDEEM_MAX_RETRIES']
+    for attempt in range(attempts):
+        try:
+            return _redeem_once(user_id, reward_id)
+        except (OperationalError, IntegrityError):
+            db.session.rollback()
+            if attempt + 1 == attempts:
+                raise
+            time.sleep(0.005 * 2 ** attempt)
+
+
+def _redeem_once(user_id, reward_id):
+    reward = db.session.get(models.Reward, reward_id)
     if not reward:
         return False, "Reward not found"
-    
-    points = calculate_points(user_id)
-    if points < reward.cost_points:
+    if reward.stock is not None and reward.stock <= 0:
+        return False, "Out of stock"
+    if not debit_points(user_id, reward.cost_points, f"redeem:{reward.name}"):
+        db.session.rollback()
         return False, "Not enough points"
-    
-    redemption = models.Redemption(user_id=user_id, reward_id=reward.id)
-    log = models.PointsLog(user_id=user_id, delta=-reward.cost_points,
-                           reason=f"Redeemed {reward.name}")
-    db.session.add(redemption)
-    db.session.add(log)
+    if reward.stock is not None:
+        taken = db.session.execute(update(models.Reward)
+                                   .where(models.Reward.id == reward.id, models.Reward.stock > 0)
+                                   .values(stock=models.Reward.stock - 1)
+                                   .execution_options(synchronize_session=False)).rowcount
+        if not taken:
+            db.session.rollback()
+            return False, "Out of stock"
+    db.session.add(models.Redemption(user_id=user_id, reward_id=reward.id))
     db.session.commit()
     return True, f"Redeemed {reward.name}"
 
@@ -225,16 +406,14 @@ def redeem_reward(user_id, reward_id):
 # -----------------------------
 def get_team_points(team_id):
     """Get total points for all users in a team."""
-    users = models.User.query.filter_by(team_id=team_id).all()
-    return sum(calculate_points(u.id) for u in users)
+    stats = db.session.get(models.TeamStats, team_id)
+    return stats.points if stats else 0
 
 
 def get_leaderboard(top_n=10):
     """Get leaderboard of users by points."""
-    users = models.User.query.all()
-    leaderboard = [(u.username, calculate_points(u.id)) for u in users]
-    leaderboard.sort(key=lambda x: x[1], reverse=True)
-    return leaderboard[:top_n]
+    from leaderboard import top_users
+    return [(row["username"], row["points"]) for row in top_users(top_n)]
 
 
 # -----------------------------
@@ -260,10 +439,8 @@ def log_vendor_redemption(user_id, vendor_id, item, points_used):
     
     redemption = models.Redemption(user_id=user_id, reward_id=None,
                                    vendor_id=vendor_id)
-    log = models.PointsLog(user_id=user_id, delta=-points_used,
-                           reason=f"Vendor redemption: {item}")
     db.session.add(redemption)
-    db.session.add(log)
+    add_points(user_id, -points_used, f"Vendor redemption: {item}")
     db.session.commit()
     return True, f"Redeemed {item} with {points_used} points"
 
@@ -289,22 +466,6 @@ def seed_admin():
 
 
 def generate_trend_graph(labels, values):
-    """Generate a trend graph and return it as a base64 string."""
-    fig, ax = plt.subplots(figsize=(8, 4))
-
-    ax.plot(labels, values, marker='o', linestyle='-', color='b')
-    ax.set(xlabel='Date', ylabel='Items Processed', title='Daily Plastic Log Trend')
-
-    # Rotate the x-axis labels for readability
-    plt.xticks(rotation=45, ha='right')
-
-    # Save the plot to a BytesIO buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-
-    # Convert image to base64 for rendering in HTML
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-
-    return img_str
+    """Generate a trend graph and return it as an inline SVG string."""
+    return svg_line_chart(labels, values, title='Daily Plastic Log Trend',
+                          xlabel='Date', ylabel='Items Processed')
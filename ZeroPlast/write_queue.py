@@ -0,0 +1,91 @@
+"""
+Coalesce concurrent plastic-log writes into grouped transactions.
+
+SQLite has a single write lock, so under load every add_log request queues
+for it and commits on its own. With WRITE_COALESCING on, requests hand
+their entry to one writer thread instead. The writer takes everything that
+has queued up (waiting up to WRITE_COALESCE_WINDOW_MS for more, at most
+WRITE_COALESCE_MAX entries), writes the batch with record_plastic_batch,
+commits once and then wakes the waiting requests, which still see their
+own write when they redirect.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from app_setup import db
+from utils import record_plastic_batch
+
+log = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    def __init__(self, app, window_ms, max_batch):
+        self.app = app
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.entries = 0
+        threading.Thread(target=self._run, name='write-coalescer', daemon=True).start()
+
+    def submit(self, entry) -> Future:
+        future = Future()
+        self.queue.put((entry, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            with self.app.app_context():
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            record_plastic_batch([entry for entry, _ in batch])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Retry one by one so a single bad entry only fails its own request
+            log.warning("coalesced write of %d entries failed, retrying individually", len(batch))
+            for item in batch:
+                self._write([item])
+            return
+        self.batches += 1
+        self.entries += len(batch)
+        for _, future in batch:
+            future.set_result(True)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "entries": self.entries, "queued": self.queue.qsize()}
+
+
+_coalescer = None
+_lock = threading.Lock()
+
+
+def coalescer():
+    global _coalescer
+    with _lock:
+        if _coalescer is None:
+            config = current_app.config
+            _coalescer = WriteCoalescer(current_app._get_current_object(),
+                                        config['WRITE_COALESCE_WINDOW_MS'], config['WRITE_COALESCE_MAX'])
+    return _coalescer
+
+
+def log_plastic(user_id, item, quantity, reason='plastic_log', timeout=30):
+    """Queue a PlasticLog + PointsLog write and wait until it has been committed."""
+    entry = {"user_id": user_id, "item": item, "quantity": quantity, "reason": reason}
+    return coalescer().submit(entry).result(timeout)